@@ -0,0 +1,562 @@
+import asyncio
+import json
+import random
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import AsyncIterator, Dict, List
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from ai_engine.circuit_breaker import CircuitBreaker, CircuitOpenError
+from ai_engine.latency import percentile_ms
+from config import env, env_int
+
+try:
+    import httpx
+except ImportError:  # httpx is optional; the async generators fall back to the sync client in a thread
+    httpx = None
+
+# Statuses worth retrying: rate limiting and transient server errors
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+DEFAULT_MAX_RETRIES = 3
+BACKOFF_BASE_SECONDS = 0.5
+# Upper bound on any single wait, including one asked for by Retry-After
+MAX_RETRY_DELAY_SECONDS = 30.0
+# A retry is only made if at least this long of the call's timeout is left after the backoff
+MIN_ATTEMPT_SECONDS = 1.0
+DEFAULT_POOL_SIZE = 16
+# Connections the async client may open at once; idle ones above DEFAULT_POOL_SIZE are closed
+DEFAULT_ASYNC_POOL_SIZE = 100
+# Consecutive failed attempts (timeouts, connection errors, 408/429/5xx) that open the circuit
+DEFAULT_BREAKER_FAILURES = 5
+# Seconds the circuit stays open before a probe call is let through
+DEFAULT_BREAKER_RESET_SECONDS = 30
+# Seconds after which a probe that never reported back is taken as lost; above one call's timeout
+DEFAULT_BREAKER_PROBE_TIMEOUT_SECONDS = 60
+# Latencies kept for the percentiles in AzureClientMetrics.snapshot()
+LATENCY_WINDOW = 1000
+
+
+def _retry_after_seconds(headers) -> float | None:
+    """Delay asked for by a Retry-After header (seconds or an HTTP date), if any"""
+    value = headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def _backoff_delay(attempt: int, headers=None) -> float:
+    """Full-jitter exponential backoff, but no shorter than Retry-After in the response headers"""
+    delay = random.uniform(0, BACKOFF_BASE_SECONDS * (2 ** attempt))
+    retry_after = _retry_after_seconds(headers) if headers is not None else None
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return min(delay, MAX_RETRY_DELAY_SECONDS)
+
+
+def _check_breaker(client, attempt: int):
+    if client.breaker is not None and not client.breaker.allow():
+        if attempt:
+            client.metrics.record_call(False)  # Failed attempts already went out
+        else:
+            client.metrics.record_rejected()
+        raise CircuitOpenError("Azure OpenAI circuit is open; skipping the call")
+
+
+def _release_breaker(client):
+    """An attempt ended without an outcome (cancelled, interrupted); free its probe slot"""
+    if client.breaker is not None:
+        client.breaker.release()
+
+
+def _attempt_timeout(deadline: float) -> float:
+    return max(deadline - time.monotonic(), 0.0)
+
+
+def _record_attempt(client, attempt: int, resp, status: str, latency: float, deadline: float) -> float | None:
+    """Report one attempt to the client's breaker and metrics; return the backoff
+    before retrying it, or None if it is not retried"""
+    failed = resp is None or resp.status_code in RETRY_STATUSES
+    if client.breaker is not None:
+        if failed:
+            client.breaker.record_failure(status)
+        else:
+            client.breaker.record_success()
+    delay = None
+    if failed and attempt < client.max_retries:
+        delay = _backoff_delay(attempt, resp.headers if resp is not None else None)
+        # No retry that could not finish before the call's deadline
+        if _attempt_timeout(deadline) - delay < MIN_ATTEMPT_SECONDS:
+            delay = None
+    client.metrics.record_attempt(status, latency, retried=delay is not None)
+    return delay
+
+
+class AzureClientMetrics:
+    """Thread-safe counters for Azure chat completion calls"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.calls = 0
+            self.succeeded = 0
+            self.failed = 0
+            self.rejected = 0
+            self.attempts = 0
+            self.retries = 0
+            self.statuses: Dict[str, int] = {}
+            self.prompt_tokens = 0
+            self.completion_tokens = 0
+            self.total_tokens = 0
+            self.latency_total = 0.0
+            self.latency_max = 0.0
+            self._latencies = deque(maxlen=LATENCY_WINDOW)
+
+    def record_attempt(self, status: str, latency: float, retried: bool):
+        with self._lock:
+            self.attempts += 1
+            self.retries += int(retried)
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+            self.latency_total += latency
+            self.latency_max = max(self.latency_max, latency)
+            self._latencies.append(latency)
+
+    def record_rejected(self):
+        with self._lock:
+            self.rejected += 1
+
+    def record_call(self, succeeded: bool, usage: Dict | None = None):
+        with self._lock:
+            self.calls += 1
+            if succeeded:
+                self.succeeded += 1
+            else:
+                self.failed += 1
+            usage = usage or {}
+            self.prompt_tokens += int(usage.get("prompt_tokens") or 0)
+            self.completion_tokens += int(usage.get("completion_tokens") or 0)
+            self.total_tokens += int(usage.get("total_tokens") or 0)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "succeeded": self.succeeded,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "attempts": self.attempts,
+                "retries": self.retries,
+                "statuses": dict(self.statuses),
+                "tokens": {
+                    "prompt": self.prompt_tokens,
+                    "completion": self.completion_tokens,
+                    "total": self.total_tokens,
+                },
+                "latency_ms": {
+                    "mean": round(self.latency_total / self.attempts * 1000, 1) if self.attempts else None,
+                    "p50": percentile_ms(self._latencies, 0.50),
+                    "p95": percentile_ms(self._latencies, 0.95),
+                    "max": round(self.latency_max * 1000, 1) if self.attempts else None,
+                },
+            }
+
+
+class AzureChatClient:
+    """Azure OpenAI chat completions over a pooled keep-alive session.
+
+    One requests.Session is shared by every caller, so repeated calls reuse
+    TCP/TLS connections (up to pool_size open at once). Request errors
+    (connection errors, timeouts, broken replies) and RETRY_STATUSES
+    responses are retried up to max_retries times with full-jitter
+    exponential backoff, waiting at least as long as a Retry-After header
+    asks. timeout_seconds bounds the whole call, retries and backoff
+    included. Every attempt's latency and status and every
+    call's token usage go into `metrics`.
+
+    With a `breaker`, each attempt's outcome is reported to it, and while it
+    is open calls (and remaining retries) fail at once with CircuitOpenError
+    instead of waiting on Azure.
+    """
+
+    def __init__(
+        self,
+        endpoint: str,
+        api_key: str,
+        api_version: str,
+        deployment: str,
+        *,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        metrics: AzureClientMetrics | None = None,
+        breaker: CircuitBreaker | None = None,
+    ):
+        self.url = f"{endpoint.rstrip('/')}/openai/deployments/{deployment}/chat/completions"
+        self.api_version = api_version
+        self.max_retries = max_retries
+        self.metrics = metrics or AzureClientMetrics()
+        self.breaker = breaker
+        self.session = requests.Session()
+        self.session.headers.update({"Content-Type": "application/json", "api-key": api_key})
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def chat(
+        self,
+        messages: List[Dict[str, str]],
+        *,
+        temperature: float,
+        max_tokens: int,
+        timeout_seconds: int = 30,
+    ) -> str:
+        """Return the first choice's message content. Raises on HTTP errors once retries run out"""
+        payload = {"messages": messages, "temperature": temperature, "max_tokens": max_tokens}
+        deadline = time.monotonic() + timeout_seconds
+        attempt = 0
+        while True:
+            _check_breaker(self, attempt)
+            start = time.perf_counter()
+            resp = error = None
+            try:
+                resp = self.session.post(
+                    self.url,
+                    params={"api-version": self.api_version},
+                    json=payload,
+                    timeout=_attempt_timeout(deadline),
+                )
+                status = str(resp.status_code)
+            except requests.RequestException as e:
+                error = e
+                status = type(e).__name__
+            except BaseException:
+                _release_breaker(self)
+                raise
+
+            delay = _record_attempt(self, attempt, resp, status, time.perf_counter() - start, deadline)
+            if delay is not None:
+                time.sleep(delay)
+                attempt += 1
+                continue
+            if error is not None:
+                self.metrics.record_call(False)
+                raise error
+
+            try:
+                resp.raise_for_status()
+                data = resp.json()
+                content = data["choices"][0]["message"]["content"].strip()
+            except Exception:
+                self.metrics.record_call(False)
+                raise
+            self.metrics.record_call(True, data.get("usage"))
+            return content
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncAzureChatClient:
+    """AzureChatClient for event loops, on one pooled httpx.AsyncClient.
+
+    Same request, retry and metrics behaviour, but waiting on Azure (and on
+    backoff) yields to the event loop instead of holding a worker thread,
+    so one worker can serve many concurrent requests.
+    """
+
+    def __init__(
+        self,
+        endpoint: str,
+        api_key: str,
+        api_version: str,
+        deployment: str,
+        *,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        pool_size: int = DEFAULT_ASYNC_POOL_SIZE,
+        metrics: AzureClientMetrics | None = None,
+        breaker: CircuitBreaker | None = None,
+    ):
+        if httpx is None:
+            raise RuntimeError("httpx is required for the async Azure client")
+        self.url = f"{endpoint.rstrip('/')}/openai/deployments/{deployment}/chat/completions"
+        self.api_version = api_version
+        self.max_retries = max_retries
+        self.metrics = metrics or AzureClientMetrics()
+        self.breaker = breaker
+        self.client = httpx.AsyncClient(
+            headers={"Content-Type": "application/json", "api-key": api_key},
+            limits=httpx.Limits(
+                max_connections=pool_size,
+                max_keepalive_connections=min(pool_size, DEFAULT_POOL_SIZE),
+            ),
+        )
+
+    async def chat(
+        self,
+        messages: List[Dict[str, str]],
+        *,
+        temperature: float,
+        max_tokens: int,
+        timeout_seconds: int = 30,
+    ) -> str:
+        """Return the first choice's message content. Raises on HTTP errors once retries run out"""
+        payload = {"messages": messages, "temperature": temperature, "max_tokens": max_tokens}
+        deadline = time.monotonic() + timeout_seconds
+        attempt = 0
+        while True:
+            _check_breaker(self, attempt)
+            start = time.perf_counter()
+            resp = error = None
+            try:
+                resp = await self.client.post(
+                    self.url,
+                    params={"api-version": self.api_version},
+                    json=payload,
+                    timeout=_attempt_timeout(deadline),
+                )
+                status = str(resp.status_code)
+            except httpx.HTTPError as e:
+                error = e
+                status = type(e).__name__
+            except BaseException:
+                # Cancelled (e.g. the client disconnected) before Azure answered
+                _release_breaker(self)
+                raise
+
+            delay = _record_attempt(self, attempt, resp, status, time.perf_counter() - start, deadline)
+            if delay is not None:
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            if error is not None:
+                self.metrics.record_call(False)
+                raise error
+
+            try:
+                resp.raise_for_status()
+                data = resp.json()
+                content = data["choices"][0]["message"]["content"].strip()
+            except Exception:
+                self.metrics.record_call(False)
+                raise
+            self.metrics.record_call(True, data.get("usage"))
+            return content
+
+    async def chat_stream(
+        self,
+        messages: List[Dict[str, str]],
+        *,
+        temperature: float,
+        max_tokens: int,
+        timeout_seconds: int = 30,
+    ) -> AsyncIterator[str]:
+        """Yield the reply's content as Azure streams it (server-sent events).
+
+        Attempts that fail before the reply starts are retried like chat(),
+        within timeout_seconds; once content has been yielded, errors are
+        raised to the caller. The latency recorded per attempt is the time to
+        the response headers.
+        """
+        payload = {
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "stream": True,
+            "stream_options": {"include_usage": True},
+        }
+        deadline = time.monotonic() + timeout_seconds
+        attempt = 0
+        while True:
+            _check_breaker(self, attempt)
+            start = time.perf_counter()
+            recorded = False
+            delay = None
+            try:
+                async with self.client.stream(
+                    "POST",
+                    self.url,
+                    params={"api-version": self.api_version},
+                    json=payload,
+                    timeout=_attempt_timeout(deadline),
+                ) as resp:
+                    delay = _record_attempt(
+                        self, attempt, resp, str(resp.status_code), time.perf_counter() - start, deadline
+                    )
+                    recorded = True
+                    if delay is None:
+                        if resp.is_error:
+                            await resp.aread()
+                            resp.raise_for_status()
+                        usage = None
+                        async for line in resp.aiter_lines():
+                            if not line.startswith("data:"):
+                                continue
+                            data = line[len("data:"):].strip()
+                            if data == "[DONE]":
+                                break
+                            chunk = json.loads(data)
+                            usage = chunk.get("usage") or usage
+                            for choice in chunk.get("choices") or []:
+                                delta = (choice.get("delta") or {}).get("content")
+                                if delta:
+                                    yield delta
+                        self.metrics.record_call(True, usage)
+                        return
+            except httpx.HTTPError as e:
+                if recorded:
+                    self.metrics.record_call(False)
+                    raise
+                delay = _record_attempt(self, attempt, None, type(e).__name__, time.perf_counter() - start, deadline)
+                recorded = True
+                if delay is None:
+                    self.metrics.record_call(False)
+                    raise
+            except Exception:
+                self.metrics.record_call(False)
+                raise
+            finally:
+                if not recorded:
+                    _release_breaker(self)
+
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+# Shared across client rebuilds so totals cover the whole process
+_metrics = AzureClientMetrics()
+_client: AzureChatClient | None = None
+_client_config: tuple | None = None
+_client_lock = threading.Lock()
+_async_client: AsyncAzureChatClient | None = None
+_async_client_key: tuple | None = None
+_breaker: CircuitBreaker | None = None
+
+
+def azure_breaker() -> CircuitBreaker:
+    """The circuit breaker shared by the sync and async clients.
+
+    Created on first use (after .env is loaded) from AZURE_BREAKER_FAILURES,
+    AZURE_BREAKER_RESET_SECONDS and AZURE_BREAKER_PROBE_TIMEOUT_SECONDS.
+    """
+    global _breaker
+    with _client_lock:
+        if _breaker is None:
+            _breaker = CircuitBreaker(
+                "azure_openai",
+                failure_threshold=env_int("AZURE_BREAKER_FAILURES", DEFAULT_BREAKER_FAILURES),
+                reset_seconds=env_int("AZURE_BREAKER_RESET_SECONDS", DEFAULT_BREAKER_RESET_SECONDS),
+                probe_timeout_seconds=env_int(
+                    "AZURE_BREAKER_PROBE_TIMEOUT_SECONDS", DEFAULT_BREAKER_PROBE_TIMEOUT_SECONDS
+                ),
+            )
+        return _breaker
+
+
+def azure_config() -> tuple | None:
+    """(endpoint, api_key, api_version, deployment) from the environment, or None if incomplete"""
+    config = (
+        env("AZURE_ENDPOINT"),
+        env("AZURE_OPENAI_API_KEY"),
+        env("AZURE_API_VERSION"),
+        env("AZURE_DEPLOYMENT"),
+    )
+    return config if all(config) else None
+
+
+def get_azure_client() -> AzureChatClient:
+    """The process-wide client, rebuilt only when the Azure env vars change.
+
+    AZURE_MAX_RETRIES sets the retries per call; the pool holds at least
+    AZURE_MAX_WORKERS connections so concurrent comparator calls never wait
+    for one.
+    """
+    global _client, _client_config
+    config = azure_config()
+    if config is None:
+        raise RuntimeError("Azure OpenAI env vars are not fully configured")
+    breaker = azure_breaker()
+    with _client_lock:
+        if _client is None or _client_config != config:
+            if _client is not None:
+                _client.close()
+            _client = AzureChatClient(
+                *config,
+                max_retries=env_int("AZURE_MAX_RETRIES", DEFAULT_MAX_RETRIES),
+                pool_size=max(env_int("AZURE_MAX_WORKERS", 4), DEFAULT_POOL_SIZE),
+                metrics=_metrics,
+                breaker=breaker,
+            )
+            _client_config = config
+        return _client
+
+
+def async_client_available() -> bool:
+    return httpx is not None
+
+
+def get_async_azure_client() -> AsyncAzureChatClient:
+    """The client for the running event loop, rebuilt when the loop or the Azure env vars change.
+
+    httpx connections belong to the loop that opened them, so a client is
+    only reused within one loop. It shares its metrics with get_azure_client().
+    """
+    global _async_client, _async_client_key
+    config = azure_config()
+    if config is None:
+        raise RuntimeError("Azure OpenAI env vars are not fully configured")
+    loop = asyncio.get_running_loop()
+    breaker = azure_breaker()
+    with _client_lock:
+        if _async_client is None or _async_client_key != (config, loop):
+            if _async_client is not None and _async_client_key[1] is loop:
+                loop.create_task(_async_client.aclose())
+            _async_client = AsyncAzureChatClient(
+                *config,
+                max_retries=env_int("AZURE_MAX_RETRIES", DEFAULT_MAX_RETRIES),
+                metrics=_metrics,
+                breaker=breaker,
+            )
+            _async_client_key = (config, loop)
+        return _async_client
+
+
+async def close_async_azure_client():
+    """Close the async client's connections (on application shutdown)"""
+    global _async_client, _async_client_key
+    with _client_lock:
+        client, _async_client, _async_client_key = _async_client, None, None
+    if client is not None:
+        await client.aclose()
+
+
+def azure_health() -> Dict:
+    """Whether Azure is configured, the circuit breaker's state and the client metrics"""
+    return {
+        "configured": azure_config() is not None,
+        "circuit": azure_breaker().snapshot(),
+        "metrics": azure_metrics(),
+    }
+
+
+def azure_metrics() -> Dict:
+    """Metrics of every call made through the shared sync and async clients in this process"""
+    return _metrics.snapshot()
+
+
+def reset_azure_metrics():
+    _metrics.reset()
@@ -1,30 +1,104 @@
-import os
+import asyncio
 import json
-from typing import List, Dict
+import re
+from typing import AsyncIterator, List, Dict, Tuple
+
+from ai_engine.azure_client import (
+    async_client_available,
+    azure_config,
+    get_async_azure_client,
+    get_azure_client,
+)
+from ai_engine.followup_cache import get_followup_cache
+
+# Bump whenever the missing-field prompt changes so cached templates are regenerated
+MISSING_FIELD_PROMPT_VERSION = "1"
+# Follow-up cache language for the English + Hindi generator
+BILINGUAL_CACHE_LANGUAGE = "en+hi"
+# max_tokens for a batched missing-field request: framing, plus per patient, plus per field (en + hi)
+BATCH_BASE_TOKENS = 100
+BATCH_TOKENS_PER_PATIENT = 30
+BATCH_TOKENS_PER_FIELD = 120
+BATCH_MAX_TOKENS = 6000
 
-import requests
 
+def _is_configured() -> bool:
+    return azure_config() is not None
 
-def _env(name: str) -> str | None:
-    value = os.getenv(name)
-    if value is None:
-        return None
-    value = value.strip()
-    if len(value) >= 2 and ((value[0] == value[-1]) and value[0] in ('"', "'")):
-        value = value[1:-1]
-    return value.strip() or None
 
+def _followup_request(drug_name: str, reaction: str, language: str, n_questions: int) -> Dict:
+    system = (
+        "You are a pharmacovigilance assistant. "
+        "Generate concise, clinically relevant follow-up questions to assess an adverse drug reaction. "
+        "Avoid collecting unnecessary personal data."
+    )
 
-def _is_configured() -> bool:
-    return all(
-        [
-            _env("AZURE_ENDPOINT"),
-            _env("AZURE_OPENAI_API_KEY"),
-            _env("AZURE_API_VERSION"),
-            _env("AZURE_DEPLOYMENT"),
-        ]
+    user = (
+        f"Drug: {drug_name}\n"
+        f"Reaction: {reaction}\n\n"
+        f"Generate exactly {n_questions} follow-up questions in {language}. "
+        "Return ONLY a JSON array of strings."
     )
 
+    return {
+        "messages": [
+            {"role": "system", "content": system},
+            {"role": "user", "content": user},
+        ],
+        "temperature": 0.3,
+        "max_tokens": 250,
+    }
+
+
+def _parse_followup(content: str, n_questions: int) -> List[str]:
+    questions = json.loads(content)
+    if not isinstance(questions, list) or not all(isinstance(q, str) for q in questions):
+        raise ValueError("Azure model did not return a JSON array of strings")
+
+    questions = [q.strip() for q in questions if q.strip()]
+    return questions[:n_questions]
+
+
+def _followup_bilingual_request(drug_name: str, reaction: str, n_questions: int) -> Dict:
+    system = (
+        "You are a pharmacovigilance assistant. "
+        "Generate concise, clinically relevant follow-up questions to assess an adverse drug reaction."
+    )
+
+    user = (
+        f"Drug: {drug_name}\n"
+        f"Reaction: {reaction}\n\n"
+        f"Generate exactly {n_questions} follow-up questions in English and Hindi. "
+        "Return ONLY JSON in the following format: "
+        "{\"en\": [..], \"hi\": [..]}."
+    )
+
+    return {
+        "messages": [
+            {"role": "system", "content": system},
+            {"role": "user", "content": user},
+        ],
+        "temperature": 0.7,
+        "max_tokens": 400,
+    }
+
+
+def _parse_followup_bilingual(content: str, n_questions: int) -> Dict[str, List[str]]:
+    obj = json.loads(content)
+    if not isinstance(obj, dict):
+        raise ValueError("Azure model did not return a JSON object")
+
+    en = obj.get("en")
+    hi = obj.get("hi")
+    if not isinstance(en, list) or not all(isinstance(q, str) for q in en):
+        raise ValueError("Azure model did not return valid en questions")
+    if not isinstance(hi, list) or not all(isinstance(q, str) for q in hi):
+        raise ValueError("Azure model did not return valid hi questions")
+
+    en_clean = [q.strip() for q in en if q.strip()][:n_questions]
+    hi_clean = [q.strip() for q in hi if q.strip()][:n_questions]
+    return {"en": en_clean, "hi": hi_clean}
+
 
 def generate_azure_followup_questions(
     drug_name: str,
@@ -48,62 +122,75 @@ def generate_azure_followup_questions(
     if not _is_configured():
         raise RuntimeError("Azure OpenAI env vars are not fully configured")
 
-    endpoint = _env("AZURE_ENDPOINT")
-    api_key = _env("AZURE_OPENAI_API_KEY")
-    api_version = _env("AZURE_API_VERSION")
-    deployment = _env("AZURE_DEPLOYMENT")
+    content = get_azure_client().chat(
+        **_followup_request(drug_name, reaction, language, n_questions),
+        timeout_seconds=timeout_seconds,
+    )
+    return _parse_followup(content, n_questions)
 
-    endpoint = endpoint.rstrip("/")
-    url = f"{endpoint}/openai/deployments/{deployment}/chat/completions"
 
-    system = (
-        "You are a pharmacovigilance assistant. "
-        "Generate concise, clinically relevant follow-up questions to assess an adverse drug reaction. "
-        "Avoid collecting unnecessary personal data."
-    )
+async def generate_azure_followup_questions_async(
+    drug_name: str,
+    reaction: str,
+    *,
+    language: str = "en",
+    n_questions: int = 3,
+    timeout_seconds: int = 30,
+) -> List[str]:
+    """generate_azure_followup_questions for async routes: awaits the reply instead of holding a thread.
 
-    user = (
-        f"Drug: {drug_name}\n"
-        f"Reaction: {reaction}\n\n"
-        f"Generate exactly {n_questions} follow-up questions in {language}. "
-        "Return ONLY a JSON array of strings."
-    )
+    Results are served from the follow-up question cache, and concurrent
+    identical requests share one Azure call.
+    """
 
-    payload = {
-        "messages": [
-            {"role": "system", "content": system},
-            {"role": "user", "content": user},
-        ],
-        "temperature": 0.3,
-        "max_tokens": 250,
-    }
+    if not _is_configured():
+        raise RuntimeError("Azure OpenAI env vars are not fully configured")
 
-    headers = {
-        "Content-Type": "application/json",
-        "api-key": api_key,
-    }
+    cache = get_followup_cache()
+    return await cache.get_or_generate(
+        cache.make_key(drug_name, reaction, language, n_questions),
+        lambda: _followup_questions_async(drug_name, reaction, language, n_questions, timeout_seconds),
+    )
 
-    resp = requests.post(
-        url,
-        params={"api-version": api_version},
-        headers=headers,
-        json=payload,
-        timeout=timeout_seconds,
+
+async def _followup_questions_async(
+    drug_name: str, reaction: str, language: str, n_questions: int, timeout_seconds: int
+) -> List[str]:
+    if not async_client_available():
+        return await asyncio.to_thread(
+            generate_azure_followup_questions,
+            drug_name,
+            reaction,
+            language=language,
+            n_questions=n_questions,
+            timeout_seconds=timeout_seconds,
+        )
+
+    content = await get_async_azure_client().chat(
+        **_followup_request(drug_name, reaction, language, n_questions),
+        timeout_seconds=timeout_seconds,
     )
-    resp.raise_for_status()
+    return _parse_followup(content, n_questions)
 
-    data = resp.json()
-    content = data["choices"][0]["message"]["content"].strip()
 
-    questions = json.loads(content)
-    if not isinstance(questions, list) or not all(isinstance(q, str) for q in questions):
-        raise ValueError("Azure model did not return a JSON array of strings")
+def generate_azure_followup_questions_bilingual(
+    drug_name: str,
+    reaction: str,
+    *,
+    n_questions: int = 3,
+    timeout_seconds: int = 30,
+) -> Dict[str, List[str]]:
+    if not _is_configured():
+        raise RuntimeError("Azure OpenAI env vars are not fully configured")
 
-    questions = [q.strip() for q in questions if q.strip()]
-    return questions[:n_questions]
+    content = get_azure_client().chat(
+        **_followup_bilingual_request(drug_name, reaction, n_questions),
+        timeout_seconds=timeout_seconds,
+    )
+    return _parse_followup_bilingual(content, n_questions)
 
 
-def generate_azure_followup_questions_bilingual(
+async def generate_azure_followup_questions_bilingual_async(
     drug_name: str,
     reaction: str,
     *,
@@ -113,14 +200,37 @@ def generate_azure_followup_questions_bilingual(
     if not _is_configured():
         raise RuntimeError("Azure OpenAI env vars are not fully configured")
 
-    endpoint = _env("AZURE_ENDPOINT")
-    api_key = _env("AZURE_OPENAI_API_KEY")
-    api_version = _env("AZURE_API_VERSION")
-    deployment = _env("AZURE_DEPLOYMENT")
+    cache = get_followup_cache()
+    return await cache.get_or_generate(
+        cache.make_key(drug_name, reaction, BILINGUAL_CACHE_LANGUAGE, n_questions),
+        lambda: _followup_questions_bilingual_async(drug_name, reaction, n_questions, timeout_seconds),
+    )
+
+
+async def _followup_questions_bilingual_async(
+    drug_name: str, reaction: str, n_questions: int, timeout_seconds: int
+) -> Dict[str, List[str]]:
+    if not async_client_available():
+        return await asyncio.to_thread(
+            generate_azure_followup_questions_bilingual,
+            drug_name,
+            reaction,
+            n_questions=n_questions,
+            timeout_seconds=timeout_seconds,
+        )
+
+    content = await get_async_azure_client().chat(
+        **_followup_bilingual_request(drug_name, reaction, n_questions),
+        timeout_seconds=timeout_seconds,
+    )
+    return _parse_followup_bilingual(content, n_questions)
+
+
+# "EN: ..." / "HI: ..." lines of the streamed follow-up reply, tolerating numbering and bullets
+_STREAM_LINE_RE = re.compile(r"^\s*(?:[-*\d.)]+\s*)?(EN|HI)\s*[:\-]\s*(.+?)\s*$", re.IGNORECASE)
 
-    endpoint = endpoint.rstrip("/")
-    url = f"{endpoint}/openai/deployments/{deployment}/chat/completions"
 
+def _followup_stream_request(drug_name: str, reaction: str, n_questions: int) -> Dict:
     system = (
         "You are a pharmacovigilance assistant. "
         "Generate concise, clinically relevant follow-up questions to assess an adverse drug reaction."
@@ -129,12 +239,12 @@ def generate_azure_followup_questions_bilingual(
     user = (
         f"Drug: {drug_name}\n"
         f"Reaction: {reaction}\n\n"
-        f"Generate exactly {n_questions} follow-up questions in English and Hindi. "
-        "Return ONLY JSON in the following format: "
-        "{\"en\": [..], \"hi\": [..]}."
+        f"Generate exactly {n_questions} follow-up questions in English, then the same {n_questions} in Hindi. "
+        "Write one question per line: English lines start with \"EN: \" and Hindi lines with \"HI: \". "
+        "No numbering and no other text."
     )
 
-    payload = {
+    return {
         "messages": [
             {"role": "system", "content": system},
             {"role": "user", "content": user},
@@ -143,36 +253,70 @@ def generate_azure_followup_questions_bilingual(
         "max_tokens": 400,
     }
 
-    headers = {
-        "Content-Type": "application/json",
-        "api-key": api_key,
-    }
 
-    resp = requests.post(
-        url,
-        params={"api-version": api_version},
-        headers=headers,
-        json=payload,
-        timeout=timeout_seconds,
-    )
-    resp.raise_for_status()
+async def _whole_reply(request: Dict, timeout_seconds: int) -> AsyncIterator[str]:
+    """The reply as a single chunk, from the sync client in a thread (no httpx installed)"""
+    yield await asyncio.to_thread(get_azure_client().chat, **request, timeout_seconds=timeout_seconds)
 
-    data = resp.json()
-    content = data["choices"][0]["message"]["content"].strip()
-    obj = json.loads(content)
-    if not isinstance(obj, dict):
-        raise ValueError("Azure model did not return a JSON object")
 
-    en = obj.get("en")
-    hi = obj.get("hi")
-    if not isinstance(en, list) or not all(isinstance(q, str) for q in en):
-        raise ValueError("Azure model did not return valid en questions")
-    if not isinstance(hi, list) or not all(isinstance(q, str) for q in hi):
-        raise ValueError("Azure model did not return valid hi questions")
+async def stream_azure_followup_questions_bilingual(
+    drug_name: str,
+    reaction: str,
+    *,
+    n_questions: int = 3,
+    timeout_seconds: int = 30,
+) -> AsyncIterator[Tuple[str, str]]:
+    """Yield ("en" | "hi", question) as each question line of the reply completes.
 
-    en_clean = [q.strip() for q in en if q.strip()][:n_questions]
-    hi_clean = [q.strip() for q in hi if q.strip()][:n_questions]
-    return {"en": en_clean, "hi": hi_clean}
+    Shares the follow-up question cache with
+    generate_azure_followup_questions_bilingual_async: a cached entry is
+    replayed at once, and a complete streamed reply is stored. Raises on
+    HTTP errors; questions already yielded stay valid.
+    """
+    if not _is_configured():
+        raise RuntimeError("Azure OpenAI env vars are not fully configured")
+
+    cache = get_followup_cache()
+    key = cache.make_key(drug_name, reaction, BILINGUAL_CACHE_LANGUAGE, n_questions)
+    cached = cache.get(key)
+    if cached is not None:
+        for language in ("en", "hi"):
+            for question in cached.get(language) or []:
+                yield language, question
+        return
+
+    request = _followup_stream_request(drug_name, reaction, n_questions)
+    if async_client_available():
+        chunks = get_async_azure_client().chat_stream(**request, timeout_seconds=timeout_seconds)
+    else:
+        chunks = _whole_reply(request, timeout_seconds)
+
+    questions: Dict[str, List[str]] = {"en": [], "hi": []}
+
+    def take(line: str):
+        match = _STREAM_LINE_RE.match(line)
+        if match is None:
+            return None
+        language, question = match.group(1).lower(), match.group(2)
+        if len(questions[language]) >= n_questions:
+            return None
+        questions[language].append(question)
+        return language, question
+
+    pending = ""
+    async for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            taken = take(line)
+            if taken:
+                yield taken
+    taken = take(pending)
+    if taken:
+        yield taken
+
+    if questions["en"] and questions["hi"]:
+        cache.put(key, questions)
 
 
 def generate_azure_missing_field_questions(
@@ -194,14 +338,6 @@ def generate_azure_missing_field_questions(
     if not missing_fields:
         return {}
 
-    endpoint = _env("AZURE_ENDPOINT")
-    api_key = _env("AZURE_OPENAI_API_KEY")
-    api_version = _env("AZURE_API_VERSION")
-    deployment = _env("AZURE_DEPLOYMENT")
-
-    endpoint = endpoint.rstrip("/")
-    url = f"{endpoint}/openai/deployments/{deployment}/chat/completions"
-
     system = (
         "You are a pharmacovigilance data-collection assistant. "
         "Your job is to ask patients for missing report fields. "
@@ -220,31 +356,15 @@ def generate_azure_missing_field_questions(
         "Return ONLY a JSON object where each key is the exact field name and the value is the question string."
     )
 
-    payload = {
-        "messages": [
+    content = get_azure_client().chat(
+        [
             {"role": "system", "content": system},
             {"role": "user", "content": user},
         ],
-        "temperature": 0.7,
-        "max_tokens": 700,
-    }
-
-    headers = {
-        "Content-Type": "application/json",
-        "api-key": api_key,
-    }
-
-    resp = requests.post(
-        url,
-        params={"api-version": api_version},
-        headers=headers,
-        json=payload,
-        timeout=timeout_seconds,
+        temperature=0.7,
+        max_tokens=700,
+        timeout_seconds=timeout_seconds,
     )
-    resp.raise_for_status()
-
-    data = resp.json()
-    content = data["choices"][0]["message"]["content"].strip()
 
     mapping = json.loads(content)
     if not isinstance(mapping, dict):
@@ -272,14 +392,6 @@ def generate_azure_missing_field_questions_bilingual(
     if not missing_fields:
         return {"en": {}, "hi": {}}
 
-    endpoint = _env("AZURE_ENDPOINT")
-    api_key = _env("AZURE_OPENAI_API_KEY")
-    api_version = _env("AZURE_API_VERSION")
-    deployment = _env("AZURE_DEPLOYMENT")
-
-    endpoint = endpoint.rstrip("/")
-    url = f"{endpoint}/openai/deployments/{deployment}/chat/completions"
-
     system = (
         "You are a pharmacovigilance data-collection assistant. "
         "Ask exactly one question per missing field. "
@@ -297,35 +409,22 @@ def generate_azure_missing_field_questions_bilingual(
         "Keys must be the exact field names."
     )
 
-    payload = {
-        "messages": [
+    content = get_azure_client().chat(
+        [
             {"role": "system", "content": system},
             {"role": "user", "content": user},
         ],
-        "temperature": 0.7,
-        "max_tokens": 900,
-    }
-
-    headers = {
-        "Content-Type": "application/json",
-        "api-key": api_key,
-    }
-
-    resp = requests.post(
-        url,
-        params={"api-version": api_version},
-        headers=headers,
-        json=payload,
-        timeout=timeout_seconds,
+        temperature=0.7,
+        max_tokens=900,
+        timeout_seconds=timeout_seconds,
     )
-    resp.raise_for_status()
-
-    data = resp.json()
-    content = data["choices"][0]["message"]["content"].strip()
     obj = json.loads(content)
     if not isinstance(obj, dict):
         raise ValueError("Azure model did not return a JSON object")
+    return _clean_bilingual_field_questions(obj, missing_fields)
+
 
+def _clean_bilingual_field_questions(obj: Dict, missing_fields: List[str]) -> Dict[str, Dict[str, str]]:
     en_map = obj.get("en")
     hi_map = obj.get("hi")
     if not isinstance(en_map, dict) or not isinstance(hi_map, dict):
@@ -342,3 +441,80 @@ def generate_azure_missing_field_questions_bilingual(
             hi_clean[field] = q_hi.strip()
 
     return {"en": en_clean, "hi": hi_clean}
+
+
+def generate_azure_missing_field_questions_bilingual_batch(
+    patients: Dict[str, Dict],
+    *,
+    timeout_seconds: int = 30,
+) -> Dict[str, Dict[str, Dict[str, str]]]:
+    """Bilingual missing-field questions for several patients in one request.
+
+    patients maps a case id to {"patient_initials", "contact_no",
+    "missing_fields"}. Returns case id -> {"en": {field: question}, "hi":
+    {...}} for the patients whose part of the reply is valid, i.e. has an
+    English question for every missing field; callers should fall back to
+    generate_azure_missing_field_questions_bilingual for the others. Raises
+    on HTTP errors or when the reply is not a JSON object at all.
+    """
+    if not _is_configured():
+        raise RuntimeError("Azure OpenAI env vars are not fully configured")
+
+    patients = {case_id: p for case_id, p in patients.items() if p["missing_fields"]}
+    if not patients:
+        return {}
+
+    system = (
+        "You are a pharmacovigilance data-collection assistant. "
+        "Ask exactly one question per missing field. "
+        "Be clear and concise."
+    )
+
+    patients_json = json.dumps(
+        {
+            str(case_id): {
+                "patient": f"patient {p['patient_initials']} (PHN: {p['contact_no']})",
+                "missing_fields": list(p["missing_fields"]),
+            }
+            for case_id, p in patients.items()
+        },
+        ensure_ascii=False,
+    )
+
+    user = (
+        f"Patients (JSON, id -> patient and missing CSV fields): {patients_json}\n\n"
+        "For every patient id, write one question per missing field in English and Hindi. "
+        "Return ONLY JSON in the following format: "
+        "{id: {\"en\": {field: question}, \"hi\": {field: question}}}. "
+        "Keys must be the exact ids and field names."
+    )
+
+    field_count = sum(len(p["missing_fields"]) for p in patients.values())
+    content = get_azure_client().chat(
+        [
+            {"role": "system", "content": system},
+            {"role": "user", "content": user},
+        ],
+        temperature=0.7,
+        max_tokens=min(
+            BATCH_BASE_TOKENS + BATCH_TOKENS_PER_PATIENT * len(patients) + BATCH_TOKENS_PER_FIELD * field_count,
+            BATCH_MAX_TOKENS,
+        ),
+        timeout_seconds=timeout_seconds,
+    )
+    obj = json.loads(content)
+    if not isinstance(obj, dict):
+        raise ValueError("Azure model did not return a JSON object")
+
+    results: Dict[str, Dict[str, Dict[str, str]]] = {}
+    for case_id, p in patients.items():
+        sub = obj.get(str(case_id))
+        if not isinstance(sub, dict):
+            continue
+        try:
+            cleaned = _clean_bilingual_field_questions(sub, list(p["missing_fields"]))
+        except ValueError:
+            continue
+        if len(cleaned["en"]) == len(p["missing_fields"]):
+            results[case_id] = cleaned
+    return results
@@ -0,0 +1,111 @@
+import threading
+import time
+from typing import Dict
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a backend whose circuit is open"""
+
+
+class CircuitBreaker:
+    """Stops calling a failing backend for a while, then probes it.
+
+    Closed: calls go through; failure_threshold consecutive failures open
+    the circuit. Open: calls are refused (allow() is False) for
+    reset_seconds. Half-open: one probe call is let through; its success
+    closes the circuit, its failure opens it again for another
+    reset_seconds. Every call that allow() admits must be reported with
+    record_success() or record_failure(), or with release() if it ended
+    without an outcome (e.g. it was cancelled). A probe that reports
+    nothing within probe_timeout_seconds is taken as lost, and the next
+    call becomes the probe.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        reset_seconds: float = 30.0,
+        probe_timeout_seconds: float = 60.0,
+    ):
+        self.name = name
+        self.failure_threshold = max(failure_threshold, 1)
+        self.reset_seconds = reset_seconds
+        self.probe_timeout_seconds = probe_timeout_seconds
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._probe_started = 0.0
+        self._times_opened = 0
+        self._rejected = 0
+        self._last_failure = None
+
+    def allow(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            if self._state == OPEN and now - self._opened_at >= self.reset_seconds:
+                self._state = HALF_OPEN
+                self._probe_in_flight = False
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and (
+                not self._probe_in_flight or now - self._probe_started >= self.probe_timeout_seconds
+            ):
+                self._probe_in_flight = True
+                self._probe_started = now
+                return True
+            self._rejected += 1
+            return False
+
+    def release(self):
+        """An admitted call ended without an outcome; let the next call probe instead"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self, reason: str = ""):
+        with self._lock:
+            self._failures += 1
+            self._last_failure = reason or None
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != OPEN:
+                    self._times_opened += 1
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_seconds:
+                return HALF_OPEN
+            return self._state
+
+    def snapshot(self) -> Dict:
+        state = self.state
+        with self._lock:
+            retry_in = None
+            if state == OPEN:
+                retry_in = round(max(self.reset_seconds - (time.monotonic() - self._opened_at), 0.0), 1)
+            return {
+                "name": self.name,
+                "state": state,
+                "consecutive_failures": self._failures,
+                "failure_threshold": self.failure_threshold,
+                "reset_seconds": self.reset_seconds,
+                "retry_in_seconds": retry_in,
+                "times_opened": self._times_opened,
+                "rejected_calls": self._rejected,
+                "last_failure": self._last_failure,
+            }
@@ -0,0 +1,143 @@
+import asyncio
+import copy
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+from config import env_int
+
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_TTL_SECONDS = 6 * 3600
+
+
+def _normalize(text: str) -> str:
+    """Case-folded, whitespace-collapsed text without surrounding punctuation"""
+    return re.sub(r"\s+", " ", str(text or "")).strip(" \t.,;:!?-\"'").casefold()
+
+
+class FollowupQuestionCache:
+    """TTL + LRU cache of generated follow-up questions, with single-flight misses.
+
+    Keys are normalized (drug, reaction, language, n_questions), so
+    "Ibuprofen / Nausea and vomiting" and "ibuprofen / nausea and vomiting."
+    share an entry. Entries expire ttl_seconds after they were stored and
+    the least recently used is evicted beyond max_entries. Concurrent
+    get_or_generate() misses for the same key wait for one upstream call
+    instead of each making their own; failures are not cached.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, ttl_seconds: float = DEFAULT_TTL_SECONDS):
+        self.max_entries = max(max_entries, 1)
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.expired = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(drug_name: str, reaction: str, language: str, n_questions: int) -> Tuple:
+        return (_normalize(drug_name), _normalize(reaction), _normalize(language), int(n_questions))
+
+    def get(self, key: Hashable):
+        """Cached value (counted as a hit) or None (counted as a miss)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= time.monotonic():
+                del self._entries[key]
+                self.expired += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return copy.deepcopy(entry[1])
+
+    def put(self, key: Hashable, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, copy.deepcopy(value))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    async def get_or_generate(self, key: Hashable, generate: Callable[[], Awaitable]):
+        """The cached value for key, else the result of one generate() shared by all concurrent callers"""
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        loop = asyncio.get_running_loop()
+        while True:
+            pending = self._in_flight.get(key)
+            if pending is None or pending.get_loop() is not loop:
+                break
+            self.coalesced += 1
+            try:
+                return copy.deepcopy(await asyncio.shield(pending))
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise  # This caller was cancelled, not the shared call
+                # The caller making the shared call went away; make it ourselves
+
+        future = loop.create_future()
+        self._in_flight[key] = future
+        try:
+            value = await generate()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Mark retrieved when nobody else was waiting
+            raise
+        finally:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+        self.put(key, value)
+        future.set_result(value)
+        return copy.deepcopy(value)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+                # Misses that waited for another caller's generation instead of making their own
+                "coalesced": self.coalesced,
+                "generated": self.misses - self.coalesced,
+                "expired": self.expired,
+                "evictions": self.evictions,
+                "in_flight": len(self._in_flight),
+            }
+
+
+_cache: FollowupQuestionCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_followup_cache() -> FollowupQuestionCache:
+    """The process-wide cache, sized on first use by FOLLOWUP_CACHE_MAX_ENTRIES and FOLLOWUP_CACHE_TTL_SECONDS"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = FollowupQuestionCache(
+                max_entries=env_int("FOLLOWUP_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES),
+                ttl_seconds=env_int("FOLLOWUP_CACHE_TTL_SECONDS", DEFAULT_TTL_SECONDS),
+            )
+        return _cache
@@ -0,0 +1,9 @@
+from typing import Iterable, Optional
+
+
+def percentile_ms(latencies: Iterable[float], p: float) -> Optional[float]:
+    """p-th percentile (0..1) of latencies in seconds, in ms rounded to 0.1; None if empty"""
+    values = sorted(latencies)
+    if not values:
+        return None
+    return round(values[min(int(p * len(values)), len(values) - 1)] * 1000, 1)
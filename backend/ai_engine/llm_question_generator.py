@@ -1,4 +1,3 @@
-from deep_translator import GoogleTranslator
 def generate_llm_followup_questions(
     drug,
     reaction,
@@ -60,9 +59,10 @@ def generate_llm_followup_questions(
    
     if language == "hi":
         try:
-            from deep_translator import GoogleTranslator
-            translator = GoogleTranslator(source="en", target="hi")
-            questions = [translator.translate(q) for q in questions]
+            from translation_cache import get_translation_cache
+            translations = get_translation_cache().translate_many(questions, "en", "hi")
+            if all(q in translations for q in questions):
+                questions = [translations[q] for q in questions]
         except Exception as e:
             print("Translation error:", e)
 
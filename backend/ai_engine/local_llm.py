@@ -1,12 +1,179 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, List
+
 import requests
+from requests.adapters import HTTPAdapter
+
+from ai_engine.followup_cache import FollowupQuestionCache
+from ai_engine.latency import percentile_ms
+from config import env_int
 
 OLLAMA_URL = "http://localhost:11434/api/generate"
+DEFAULT_MODEL = "mistral"
+# Requests the Ollama server runs at once (its OLLAMA_NUM_PARALLEL); more just queue there
+DEFAULT_MAX_PARALLEL = 1
+# How long Ollama keeps the model loaded after a request, so the next one skips the load
+DEFAULT_KEEP_ALIVE = "30m"
+DEFAULT_TIMEOUT_SECONDS = 60
+DEFAULT_CACHE_MAX_ENTRIES = 256
+DEFAULT_CACHE_TTL_SECONDS = 6 * 3600
+LATENCY_WINDOW = 1000
+
+
+def _question_lines(text: str) -> List[str]:
+    return [
+        q.strip("-• ").strip()
+        for q in text.split("\n")
+        if q.strip()
+    ]
+
+
+class OllamaClient:
+    """Ollama /api/generate over a pooled keep-alive session, with at most
+    max_parallel requests in flight.
+
+    Callers beyond max_parallel wait here (up to their timeout) instead of
+    piling onto the model server. Replies are streamed: generate() can stop
+    reading, and Ollama stops generating, once the caller has the lines it
+    needs. Replies are cached by (model, prompt).
+    """
+
+    def __init__(
+        self,
+        url: str = OLLAMA_URL,
+        model: str = DEFAULT_MODEL,
+        max_parallel: int = DEFAULT_MAX_PARALLEL,
+        keep_alive: str = DEFAULT_KEEP_ALIVE,
+        cache: FollowupQuestionCache | None = None,
+    ):
+        self.url = url
+        self.model = model
+        self.max_parallel = max(max_parallel, 1)
+        self.keep_alive = keep_alive
+        self.cache = cache if cache is not None else FollowupQuestionCache(
+            DEFAULT_CACHE_MAX_ENTRIES, DEFAULT_CACHE_TTL_SECONDS
+        )
+        self._slots = threading.BoundedSemaphore(self.max_parallel)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_parallel)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.failed = 0
+        self.stopped_early = 0
+        self._waits = deque(maxlen=LATENCY_WINDOW)
+        self._first_tokens = deque(maxlen=LATENCY_WINDOW)
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+
+    def generate(self, prompt: str, *, max_lines: int | None = None, timeout_seconds: float = DEFAULT_TIMEOUT_SECONDS) -> str:
+        """Model reply to prompt; with max_lines, only up to that many non-blank lines"""
+        key = (self.model, hashlib.sha256(prompt.encode("utf-8")).hexdigest(), max_lines)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        started = time.monotonic()
+        if not self._slots.acquire(timeout=timeout_seconds):
+            raise TimeoutError(f"No Ollama slot free within {timeout_seconds}s ({self.max_parallel} in use)")
+        try:
+            waited = time.monotonic() - started
+            text, first_token, stopped_early = self._stream(prompt, max_lines, timeout_seconds)
+        except Exception:
+            with self._lock:
+                self.calls += 1
+                self.failed += 1
+            raise
+        finally:
+            self._slots.release()
+
+        with self._lock:
+            self.calls += 1
+            self.stopped_early += int(stopped_early)
+            self._waits.append(waited)
+            if first_token is not None:
+                self._first_tokens.append(first_token - started)
+            self._latencies.append(time.monotonic() - started)
+        self.cache.put(key, text)
+        return text
+
+    def _stream(self, prompt: str, max_lines: int | None, timeout_seconds: float):
+        payload = {
+            "model": self.model,
+            "prompt": prompt,
+            "stream": True,
+            "keep_alive": self.keep_alive,
+        }
+        parts: List[str] = []
+        first_token = None
+        with self.session.post(self.url, json=payload, stream=True, timeout=timeout_seconds) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if chunk.get("error"):
+                    raise RuntimeError(f"Ollama error: {chunk['error']}")
+                token = chunk.get("response") or ""
+                if token and first_token is None:
+                    first_token = time.monotonic()
+                parts.append(token)
+                if chunk.get("done"):
+                    break
+                if max_lines is not None and "\n" in token:
+                    complete = _question_lines("".join(parts).rsplit("\n", 1)[0])
+                    if len(complete) >= max_lines:
+                        # Leaving the with block closes the response, and Ollama stops generating
+                        return "\n".join(complete[:max_lines]), first_token, True
+        return "".join(parts), first_token, False
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                "model": self.model,
+                "max_parallel": self.max_parallel,
+                "calls": self.calls,
+                "failed": self.failed,
+                "stopped_early": self.stopped_early,
+                "queue_wait_ms": {"p50": percentile_ms(self._waits, 0.50), "p95": percentile_ms(self._waits, 0.95)},
+                "first_token_ms": {"p50": percentile_ms(self._first_tokens, 0.50), "p95": percentile_ms(self._first_tokens, 0.95)},
+                "latency_ms": {"p50": percentile_ms(self._latencies, 0.50), "p95": percentile_ms(self._latencies, 0.95)},
+                "cache": self.cache.stats(),
+            }
+
+
+_client: OllamaClient | None = None
+_client_lock = threading.Lock()
+
+
+def get_ollama_client() -> OllamaClient:
+    """The process-wide client, configured on first use by OLLAMA_URL, OLLAMA_MODEL,
+    OLLAMA_MAX_PARALLEL and OLLAMA_KEEP_ALIVE
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = OllamaClient(
+                url=os.getenv("OLLAMA_URL") or OLLAMA_URL,
+                model=os.getenv("OLLAMA_MODEL") or DEFAULT_MODEL,
+                max_parallel=env_int("OLLAMA_MAX_PARALLEL", DEFAULT_MAX_PARALLEL),
+                keep_alive=os.getenv("OLLAMA_KEEP_ALIVE") or DEFAULT_KEEP_ALIVE,
+            )
+        return _client
+
 
 def generate_followup_questions_local(
     drug,
     reaction,
     risk_probability,
-    nlp_features
+    nlp_features,
+    n_questions=5,
+    timeout_seconds=DEFAULT_TIMEOUT_SECONDS,
 ):
     prompt = f"""
 You are a pharmacovigilance AI assistant.
@@ -18,27 +185,12 @@ Predicted risk probability: {risk_probability}
 Medical features:
 {nlp_features}
 
-Generate 5 concise clinical follow-up questions
+Generate {n_questions} concise clinical follow-up questions
 to assess seriousness of this adverse drug reaction.
 
 Only list the questions.
 """
 
-    payload = {
-        "model": "mistral",
-        "prompt": prompt,
-        "stream": False
-    }
-
-    response = requests.post(OLLAMA_URL, json=payload, timeout=60)
-
-    text = response.json()["response"]
-
-    questions = [
-        q.strip("-• ").strip()
-        for q in text.split("\n")
-        if q.strip()
-    ]
-
-    return questions
+    text = get_ollama_client().generate(prompt, max_lines=n_questions, timeout_seconds=timeout_seconds)
 
+    return _question_lines(text)
@@ -0,0 +1,254 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from ai_engine.azure_question_generator import (
+    generate_azure_followup_questions_async,
+    generate_azure_followup_questions_bilingual_async,
+)
+from ai_engine.latency import percentile_ms
+from ai_engine.local_llm import generate_followup_questions_local
+from ai_engine.question_generator import generate_followup_questions
+from config import env_int
+
+DEFAULT_BUDGET_MS = 3000
+LATENCY_WINDOW = 1000
+
+# Best first: a result from an earlier backend beats any from a later one
+BACKEND_ORDER = ("azure", "ollama", "rule_based")
+
+# Padding for the rule-based answer, which only has specific questions for a few drugs and reactions
+GENERIC_QUESTIONS = (
+    "Did the reaction worsen?",
+    "Did you consult a doctor?",
+    "Did symptoms improve after stopping the drug?",
+)
+
+# (drug_name, reaction, language, n_questions, risk_probability, nlp_features) -> {"en": [...], "hi": [...]}
+Backend = Callable[[str, str, str, int, float, Dict], Awaitable[Dict[str, List[str]]]]
+
+
+async def _azure_backend(drug_name, reaction, language, n_questions, risk_probability, nlp_features):
+    try:
+        return await generate_azure_followup_questions_bilingual_async(drug_name, reaction, n_questions=n_questions)
+    except Exception:
+        questions = await generate_azure_followup_questions_async(
+            drug_name,
+            reaction,
+            language=language,
+            n_questions=n_questions,
+        )
+        return {"en": questions, "hi": []}
+
+
+async def _ollama_backend(drug_name, reaction, language, n_questions, risk_probability, nlp_features):
+    questions = await asyncio.to_thread(
+        generate_followup_questions_local, drug_name, reaction, risk_probability, nlp_features, n_questions
+    )
+    return {"en": questions[:n_questions], "hi": []}
+
+
+async def _rule_based_backend(drug_name, reaction, language, n_questions, risk_probability, nlp_features):
+    # English only: translating here would put a network call on the fast path
+    questions = dict.fromkeys(generate_followup_questions(drug_name, reaction) + list(GENERIC_QUESTIONS))
+    return {"en": list(questions)[:n_questions], "hi": []}
+
+
+DEFAULT_BACKENDS: Dict[str, Backend] = {
+    "azure": _azure_backend,
+    "ollama": _ollama_backend,
+    "rule_based": _rule_based_backend,
+}
+
+
+class BackendStats:
+    """Thread-safe counters for one question backend"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.calls = 0
+            self.succeeded = 0
+            self.failed = 0
+            self.wins = 0
+            self.late = 0
+            self._latencies = deque(maxlen=LATENCY_WINDOW)
+
+    def record_finished(self, succeeded: bool, latency: float, late: bool):
+        with self._lock:
+            self.calls += 1
+            if succeeded:
+                self.succeeded += 1
+            else:
+                self.failed += 1
+            self.late += int(late)
+            self._latencies.append(latency)
+
+    def record_win(self):
+        with self._lock:
+            self.wins += 1
+
+    def snapshot(self, requests: int) -> Dict:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "succeeded": self.succeeded,
+                "failed": self.failed,
+                # Finished after the request's deadline had passed
+                "late": self.late,
+                "wins": self.wins,
+                "win_rate": round(self.wins / requests, 3) if requests else None,
+                "latency_ms": {"p50": percentile_ms(self._latencies, 0.50), "p95": percentile_ms(self._latencies, 0.95)},
+            }
+
+
+class QuestionResult:
+    """Questions chosen for one request and the backend that produced them"""
+
+    def __init__(self, backend: str, questions: List[str], questions_hi: List[str], latency: float):
+        self.backend = backend
+        self.questions = questions
+        self.questions_hi = questions_hi
+        self.latency = latency
+
+
+class QuestionOrchestrator:
+    """Runs every question backend at once and keeps the best answer in a latency budget.
+
+    All backends start together: Azure and Ollama take hundreds of ms to
+    seconds, while the rule-based one finishes at once and guarantees an
+    answer. generate() returns as soon as the best backend
+    still running has answered, or at the deadline with the best answer so
+    far. Slower backends are left to finish in the background rather than
+    cancelled, so Azure still fills the follow-up question cache and its
+    latency is recorded. Exceptions and answers with fewer than n_questions
+    questions count as failures, so a partial answer never beats a later
+    backend's complete one.
+    """
+
+    def __init__(
+        self,
+        backends: Optional[Dict[str, Backend]] = None,
+        order: Tuple[str, ...] = BACKEND_ORDER,
+        budget_ms: Optional[int] = None,
+    ):
+        self.backends = dict(backends if backends is not None else DEFAULT_BACKENDS)
+        self.order = [name for name in order if name in self.backends]
+        self.budget_ms = budget_ms if budget_ms is not None else env_int("QUESTION_BUDGET_MS", DEFAULT_BUDGET_MS)
+        self.stats = {name: BackendStats() for name in self.order}
+        self.requests = 0
+        self.no_answer = 0
+        self._lock = threading.Lock()
+        self._background: set = set()
+
+    async def _run(self, name: str, args: Tuple, started: float, deadline: float):
+        n_questions = args[3]
+        try:
+            result = await self.backends[name](*args)
+            if len(result.get("en") or []) < n_questions:
+                raise ValueError(f"{name} returned {len(result.get('en') or [])} of {n_questions} questions")
+        except Exception:
+            now = time.monotonic()
+            self.stats[name].record_finished(False, now - started, now > deadline)
+            raise
+        now = time.monotonic()
+        self.stats[name].record_finished(True, now - started, now > deadline)
+        return {"en": list(result["en"]), "hi": list(result.get("hi") or [])}
+
+    async def generate(
+        self,
+        drug_name: str,
+        reaction: str,
+        *,
+        language: str = "en",
+        n_questions: int = 3,
+        risk_probability: float = 0.0,
+        nlp_features: Optional[Dict] = None,
+        budget_ms: Optional[int] = None,
+        budgeted: bool = True,
+    ) -> Optional[QuestionResult]:
+        """Best questions available within budget_ms (default: the orchestrator's budget), or None.
+
+        With budgeted=False there is no deadline: it waits for the best
+        backend to answer or fail, bounded only by the backends' own
+        timeouts. For callers no one is waiting on, like the case worker.
+        """
+        budget = (budget_ms if budget_ms is not None else self.budget_ms) / 1000.0
+        started = time.monotonic()
+        deadline = started + budget if budgeted else float("inf")
+        args = (drug_name, reaction, language, n_questions, risk_probability, nlp_features or {})
+        tasks = {name: asyncio.create_task(self._run(name, args, started, deadline)) for name in self.order}
+
+        best = None
+        try:
+            pending = set(tasks.values())
+            while pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                _, pending = await asyncio.wait(
+                    pending,
+                    timeout=remaining if budgeted else None,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                best = self._best(tasks)
+                # Stop once nothing still running could beat what we have
+                if best is not None and all(tasks[name].done() for name in self.order[:self.order.index(best)]):
+                    break
+        finally:
+            for task in tasks.values():
+                if not task.done():
+                    self._background.add(task)
+                    task.add_done_callback(self._finished_in_background)
+                elif not task.cancelled():
+                    task.exception()  # Failures are counted in the stats; don't log "never retrieved"
+
+        with self._lock:
+            self.requests += 1
+            if best is None:
+                self.no_answer += 1
+        if best is None:
+            return None
+        self.stats[best].record_win()
+        result = tasks[best].result()
+        return QuestionResult(best, result["en"], result["hi"], time.monotonic() - started)
+
+    def _best(self, tasks: Dict[str, asyncio.Task]) -> Optional[str]:
+        for name in self.order:
+            task = tasks[name]
+            if task.done() and not task.cancelled() and task.exception() is None:
+                return name
+        return None
+
+    def _finished_in_background(self, task: asyncio.Task):
+        self._background.discard(task)
+        if not task.cancelled():
+            task.exception()
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            requests, no_answer = self.requests, self.no_answer
+        return {
+            "budget_ms": self.budget_ms,
+            "requests": requests,
+            "no_answer": no_answer,
+            "backends": {name: self.stats[name].snapshot(requests) for name in self.order},
+        }
+
+
+_orchestrator: QuestionOrchestrator | None = None
+_orchestrator_lock = threading.Lock()
+
+
+def get_question_orchestrator() -> QuestionOrchestrator:
+    """The process-wide orchestrator over all backends, budgeted by QUESTION_BUDGET_MS"""
+    global _orchestrator
+    with _orchestrator_lock:
+        if _orchestrator is None:
+            _orchestrator = QuestionOrchestrator()
+        return _orchestrator
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""Benchmark the comparator phase by phase on synthetic SYOMS data.
+
+For each size, generates a main/missing CSV pair (synthetic_syoms.py), then
+runs the comparator the way run_comparison does, batch by batch, timing
+each phase separately. Azure goes to a local FakeAzureServer. Finally it
+times the patient-interface queries against the resulting pv.db. All files,
+including pv.db, live in a temporary directory.
+
+Phases:
+    load cold / load warm   load_data without / with the CSV cache
+    index                   _build_main_index
+    match                   Case ID / Contact no lookup and row fingerprints
+    select                  incremental selection against stored fingerprints
+    build                   per-row comparison results
+    azure                   question templates from the fake Azure endpoint
+    questions               filling templates into per-patient questions
+    store                   store_comparison_results (database writes)
+
+Usage:
+    python benchmarks/bench_comparator.py [ROWS ...] [--batch-size N]
+        [--azure-latency-ms N] [--queries N]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(BENCH_DIR))
+sys.path.append(BENCH_DIR)
+
+from fake_azure import FakeAzureServer
+from synthetic_syoms import write_pair
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+PHASES = ['load cold', 'load warm', 'index', 'match', 'select', 'build', 'azure', 'questions', 'store']
+
+
+@contextlib.contextmanager
+def timed(timings, phase):
+    start = time.perf_counter()
+    yield
+    timings[phase] += time.perf_counter() - start
+
+
+def bench_comparator(rows: int, data_dir: str, batch_size: int, fake: FakeAzureServer):
+    from ai_engine.azure_client import azure_metrics, reset_azure_metrics
+    from database import Base, engine
+    from patient_data_comparator import PatientDataComparator
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    main_path, missing_path = write_pair(rows, data_dir)
+    comparator = PatientDataComparator(main_path, missing_path, "pv.db")
+    timings = defaultdict(float)
+    requests_before = fake.requests
+    reset_azure_metrics()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        with timed(timings, 'load cold'):
+            comparator.load_data()
+        with timed(timings, 'load warm'):
+            comparator.load_data()
+        with timed(timings, 'index'):
+            comparator._build_main_index()
+        with timed(timings, 'select'):
+            comparator._removed_case_ids = comparator._find_removed_case_ids(
+                comparator.missing_df['Case ID'].tolist()
+            )
+
+        patients = questions = 0
+        for start in range(0, rows, batch_size):
+            batch = comparator.missing_df.iloc[start:start + batch_size]
+            with timed(timings, 'match'):
+                main_positions, fingerprints = comparator._match_rows(batch, disable_azure=False)
+            with timed(timings, 'select'):
+                selected = comparator._select_changed_rows(batch, fingerprints, detect_removed=False)
+                batch = batch.iloc[selected]
+                main_positions = [main_positions[k] for k in selected]
+                fingerprints = [fingerprints[k] for k in selected]
+            with timed(timings, 'build'):
+                results = comparator._build_results(batch, main_positions, fingerprints, report_progress=False)
+            with timed(timings, 'azure'):
+                azure_results = comparator._generate_azure_questions(results, 30)
+            with timed(timings, 'questions'):
+                comparator._attach_questions(results, azure_results)
+            with timed(timings, 'store'):
+                comparator.store_comparison_results(results, scoped=True)
+            patients += len(results)
+            questions += sum(len(r['questions']) for r in results)
+
+    total = sum(timings.values())
+    print(f"\n{rows:,} rows: {patients:,} patients, {questions:,} questions, "
+          f"{fake.requests - requests_before:,} Azure calls, {total:.2f}s")
+    for phase in PHASES:
+        print(f"  {phase:<10} {timings[phase]:9.3f}s  {timings[phase] / rows * 1e6:9.1f} us/row")
+    metrics = azure_metrics()
+    if metrics['calls']:
+        print(f"  Azure client: {metrics['retries']} retries, {metrics['tokens']['total']:,} tokens, "
+              f"latency p50 {metrics['latency_ms']['p50']} ms / p95 {metrics['latency_ms']['p95']} ms")
+    return comparator.main_df['Contact no'].tolist()
+
+
+def bench_interface(contacts, queries: int):
+    from routes.patient_interface_routes import PatientInterface, get_all_patients
+
+    interface = PatientInterface("./pv.db")
+    sample = random.Random(0).sample(contacts, min(queries, len(contacts)))
+    for name, query in (
+        ('get_patient_by_phn', interface.get_patient_by_phn),
+        ('get_questions_by_phn', interface.get_questions_by_phn),
+        ('get_patient_summary', interface.get_patient_summary),
+    ):
+        start = time.perf_counter()
+        for phn in sample:
+            query(str(phn))
+        elapsed = time.perf_counter() - start
+        print(f"  {name:<22} {elapsed / len(sample) * 1e3:9.2f} ms/query ({len(sample)} queries)")
+
+    start = time.perf_counter()
+    asyncio.run(get_all_patients())
+    print(f"  {'all-patients':<22} {(time.perf_counter() - start) * 1e3:9.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time each comparator phase on synthetic data")
+    parser.add_argument("sizes", type=int, nargs="*", default=DEFAULT_SIZES)
+    parser.add_argument("--batch-size", type=int, default=100_000, help="rows compared and stored per batch")
+    parser.add_argument("--azure-latency-ms", type=float, default=0.0, help="delay per fake Azure call")
+    parser.add_argument("--queries", type=int, default=200, help="patient-interface queries per query type")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp, FakeAzureServer(latency_ms=args.azure_latency_ms) as fake:
+        os.environ.update(fake.env())
+        os.environ.pop("DISABLE_AZURE", None)
+        # Fake Azure answers in Hindi too; don't time Google Translate for the odd fallback question
+        os.environ["DISABLE_TRANSLATION"] = "1"
+        # database.py opens ./pv.db, so run from the scratch directory
+        os.chdir(tmp)
+        for size in args.sizes:
+            contacts = bench_comparator(size, os.path.join(tmp, str(size)), args.batch_size, fake)
+            bench_interface(contacts, args.queries)
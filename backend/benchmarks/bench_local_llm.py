@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""Benchmark the local-LLM (Ollama) client against a FakeOllamaServer.
+
+Many threads ask for follow-up questions at once, as the question
+orchestrator does under load; some ask about the same drug. Compares:
+
+    baseline   one unpooled blocking requests.post per call, stream=False,
+               no concurrency limit, no keep_alive (the old local_llm)
+    client     local_llm.OllamaClient: pooled session, streaming with an
+               early stop once the questions are in, max_parallel slots,
+               keep_alive and a response cache
+
+and reports wall time, per-call latency, the most requests the server
+saw in flight, model loads and tokens generated.
+
+Usage:
+    python benchmarks/bench_local_llm.py [--calls N] [--threads N] [--distinct N]
+        [--questions N] [--token-latency-ms N] [--load-ms N] [--num-parallel N]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(BENCH_DIR))
+sys.path.append(BENCH_DIR)
+
+from fake_ollama import FakeOllamaServer
+
+
+def baseline_questions(url: str, drug: str, n_questions: int):
+    """generate_followup_questions_local as it was: 5 questions, whole reply, new connection"""
+    prompt = f"\nDrug: {drug}\nReaction: rash\n\nGenerate 5 concise clinical follow-up questions\n"
+    response = requests.post(url, json={"model": "mistral", "prompt": prompt, "stream": False}, timeout=600)
+    questions = [q.strip("-• ").strip() for q in response.json()["response"].split("\n") if q.strip()]
+    return questions[:n_questions]
+
+
+def run(label, call, args, fake):
+    fake.reset_counters()
+    latencies = []
+
+    def one(i):
+        start = time.perf_counter()
+        questions = call(f"Drug{i % args.distinct}")
+        latencies.append(time.perf_counter() - start)
+        return len(questions)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        counts = list(pool.map(one, range(args.calls)))
+    wall = time.perf_counter() - start
+    assert all(count == args.questions for count in counts), counts
+    print(
+        f"{label:<9} wall {wall:7.2f}s  latency mean {statistics.mean(latencies) * 1000:7.0f} ms"
+        f"  max {max(latencies) * 1000:7.0f} ms  server requests {fake.requests:4d}"
+        f"  max in flight {fake.max_in_flight:3d}  loads {fake.loads:3d}  tokens {fake.tokens:6d}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=60)
+    parser.add_argument("--threads", type=int, default=20)
+    parser.add_argument("--distinct", type=int, default=20, help="distinct drugs among the calls")
+    parser.add_argument("--questions", type=int, default=3, help="questions each caller needs")
+    parser.add_argument("--token-latency-ms", type=float, default=2.0)
+    parser.add_argument("--load-ms", type=float, default=200.0)
+    parser.add_argument("--num-parallel", type=int, default=2)
+    args = parser.parse_args()
+
+    with FakeOllamaServer(token_latency_ms=args.token_latency_ms, load_ms=args.load_ms,
+                          num_parallel=args.num_parallel) as fake:
+        os.environ.update(fake.env())
+        os.environ["OLLAMA_MAX_PARALLEL"] = str(args.num_parallel)
+        from ai_engine.local_llm import generate_followup_questions_local, get_ollama_client
+
+        run("baseline", lambda drug: baseline_questions(fake.url, drug, args.questions), args, fake)
+        run("client", lambda drug: generate_followup_questions_local(drug, "rash", 0.5, {}, args.questions), args, fake)
+        stats = get_ollama_client().snapshot()
+        print(f"client cache hits {stats['cache']['hits']}, early stops {stats['stopped_early']}, "
+              f"queue wait p95 {stats['queue_wait_ms']['p95']} ms, first token p50 {stats['first_token_ms']['p50']} ms")
+
+
+if __name__ == "__main__":
+    main()
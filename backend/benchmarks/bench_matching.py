@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""Benchmark patient matching in PatientDataComparator.
+
+Builds synthetic main/missing frames of the requested sizes and times the
+Case ID / Contact no hash-index lookup used by compare_data. The legacy
+boolean-mask scan is timed on a small sample for comparison.
+
+Usage:
+    python benchmarks/bench_matching.py [ROWS ...]
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from patient_data_comparator import PatientDataComparator
+
+DEFAULT_SIZES = [100_000, 1_000_000]
+MASK_SAMPLE = 200
+
+
+def make_frames(rows: int, seed: int = 0):
+    """Return (main_df, missing_df) with shuffled order and some Case ID misses"""
+    rng = np.random.default_rng(seed)
+    case_ids = np.array([f"CASE-2026-{i:07d}" for i in range(rows)], dtype=object)
+    contacts = 7000000000 + rng.choice(2999999999, size=rows, replace=False)
+    main_df = pd.DataFrame({'Case ID': case_ids, 'Contact no': contacts})
+
+    order = rng.permutation(rows)
+    missing_df = main_df.iloc[order].reset_index(drop=True).copy()
+    # 10% of rows only match on Contact no, exercising the fallback index
+    fallback = rng.random(rows) < 0.1
+    missing_df.loc[fallback, 'Case ID'] = "UNKNOWN-" + missing_df.loc[fallback, 'Case ID']
+    return main_df, missing_df
+
+
+def bench(rows: int):
+    main_df, missing_df = make_frames(rows)
+    comparator = PatientDataComparator("", "", "")
+    comparator.main_df = main_df
+    comparator.missing_df = missing_df
+
+    start = time.perf_counter()
+    comparator._build_main_index()
+    build_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    matched = 0
+    for case_id, contact_no in zip(missing_df['Case ID'].tolist(), missing_df['Contact no'].tolist()):
+        if comparator._find_main_position(case_id, contact_no) is not None:
+            matched += 1
+    lookup_s = time.perf_counter() - start
+
+    sample = missing_df.head(MASK_SAMPLE)
+    start = time.perf_counter()
+    for case_id, contact_no in zip(sample['Case ID'].tolist(), sample['Contact no'].tolist()):
+        main_df[(main_df['Case ID'] == case_id) | (main_df['Contact no'] == contact_no)]
+    mask_per_row_s = (time.perf_counter() - start) / len(sample)
+
+    total_s = build_s + lookup_s
+    print(
+        f"{rows:>10,} rows | index build {build_s:7.3f}s | lookups {lookup_s:7.3f}s | "
+        f"{total_s / rows * 1e6:6.2f} us/row | matched {matched:,} | "
+        f"mask scan est. {mask_per_row_s * rows:10.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    for size in sizes:
+        bench(size)
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""Benchmark PatientDataComparator.run_comparison across COMPARISON_WORKERS.
+
+Replicates syoms1.csv / missed_converted.csv (with fresh Case IDs and
+contact numbers) up to ROWS missing-file rows, then runs a full comparison
+with Azure disabled into a fresh pv.db for each worker count. Time spent in
+store_comparison_results is reported separately, since the write phase
+stays in the parent process.
+
+Usage:
+    python benchmarks/bench_sharding.py [ROWS [WORKERS ...]]
+"""
+
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+DEFAULT_ROWS = 100_000
+
+
+def write_inputs(rows: int, directory: str):
+    main_df = pd.read_csv(os.path.join(BACKEND_DIR, "syoms1.csv"))
+    missing_df = pd.read_csv(os.path.join(BACKEND_DIR, "missed_converted.csv"))
+    copies = -(-rows // len(missing_df))
+    main_df = pd.concat([main_df] * copies, ignore_index=True).head(rows)
+    missing_df = pd.concat([missing_df] * copies, ignore_index=True).head(rows)
+    main_df['Case ID'] = missing_df['Case ID'] = [f"CASE-2026-{i:07d}" for i in range(rows)]
+    main_df['Contact no'] = missing_df['Contact no'] = range(7000000000, 7000000000 + rows)
+    main_path = os.path.join(directory, "main.csv")
+    missing_path = os.path.join(directory, "missing.csv")
+    main_df.to_csv(main_path, index=False)
+    missing_df.to_csv(missing_path, index=False)
+    return main_path, missing_path
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ROWS
+    worker_counts = [int(arg) for arg in sys.argv[2:]] or sorted({1, 2, 4, os.cpu_count() or 1})
+    os.environ.update(DISABLE_AZURE="1", FULL_COMPARISON="1", COMPARISON_BATCH_SIZE=str(max(rows // 4, 1)))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # database.py opens ./pv.db, so run from the scratch directory
+        os.chdir(tmp)
+        from database import Base, engine
+        import models.patient_comparison_model  # noqa: F401
+        from patient_data_comparator import PatientDataComparator
+
+        main_path, missing_path = write_inputs(rows, tmp)
+        store = PatientDataComparator.store_comparison_results
+        for workers in worker_counts:
+            Base.metadata.drop_all(bind=engine)
+            Base.metadata.create_all(bind=engine)
+            os.environ["COMPARISON_WORKERS"] = str(workers)
+            comparator = PatientDataComparator(main_path, missing_path, os.path.join(tmp, "pv.db"))
+
+            store_s = [0.0]
+
+            def timed_store(*args, **kwargs):
+                start = time.perf_counter()
+                store(comparator, *args, **kwargs)
+                store_s[0] += time.perf_counter() - start
+
+            comparator.store_comparison_results = timed_store
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                comparator.run_comparison()
+            total_s = time.perf_counter() - start
+            print(
+                f"{rows:>9,} rows | {workers:>2} workers | total {total_s:8.2f}s | "
+                f"compare {total_s - store_s[0]:8.2f}s | store {store_s[0]:8.2f}s"
+            )
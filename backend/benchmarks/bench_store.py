@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""Benchmark PatientDataComparator.store_comparison_results.
+
+Writes synthetic comparison results (9 missing fields per patient) into a
+fresh pv.db inside a temporary directory, then stores them a second time to
+time the update path.
+
+Usage:
+    python benchmarks/bench_store.py [PATIENTS ...]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+DEFAULT_SIZES = [139, 100_000]
+FIELDS = [
+    'Age (years)', 'Sex', 'Outcome', 'Serious (Y/N)', 'Daily Dose',
+    'Indication', 'Therapy Start Date', 'Abated After Stopping', 'Medical History',
+]
+
+
+def make_results(patients: int):
+    results = []
+    for i in range(patients):
+        case_id = f"CASE-2026-{i:07d}"
+        contact_no = 7000000000 + i
+        complete = {'Case ID': case_id, 'Patient Initials': 'AB', 'Contact no': contact_no}
+        complete.update({field: f"value {i}" for field in FIELDS})
+        results.append({
+            'case_id': case_id,
+            'patient_initials': 'AB',
+            'contact_no': contact_no,
+            'missing_fields': {
+                field: {'missing_value': None, 'correct_value': complete[field], 'field_name': field}
+                for field in FIELDS
+            },
+            'questions': [
+                {
+                    'field': field,
+                    'question': f"Please provide the {field} for patient AB (PHN: {contact_no})",
+                    'question_hi': "",
+                    'expected_answer': complete[field],
+                }
+                for field in FIELDS
+            ],
+            'complete_data': complete,
+            'incomplete_data': {
+                'Case ID': case_id, 'Patient Initials': 'AB', 'Contact no': contact_no,
+                **{field: None for field in FIELDS},
+            },
+        })
+    return results
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    with tempfile.TemporaryDirectory() as tmp:
+        # database.py opens ./pv.db, so run from the scratch directory
+        os.chdir(tmp)
+        from database import Base, engine
+        from patient_data_comparator import PatientDataComparator
+
+        comparator = PatientDataComparator("", "", os.path.join(tmp, "pv.db"))
+        for size in sizes:
+            Base.metadata.drop_all(bind=engine)
+            Base.metadata.create_all(bind=engine)
+            results = make_results(size)
+
+            start = time.perf_counter()
+            comparator.store_comparison_results(results)
+            insert_s = time.perf_counter() - start
+
+            start = time.perf_counter()
+            comparator.store_comparison_results(results)
+            update_s = time.perf_counter() - start
+
+            print(f"{size:>8,} patients | first store {insert_s:8.2f}s | re-store {update_s:8.2f}s")
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""Local stand-in for the Azure OpenAI chat completions endpoint.
+
+Answers the prompts built in ai_engine/azure_question_generator.py with
+well-formed JSON (missing-field maps, single or batched over patients, and
+follow-up question lists, single language or bilingual), after an optional
+delay and with an optional share of HTTP 500s, so benchmarks can exercise
+the real request path without network access or API keys. Requests with
+"stream": true get the reply as server-sent delta chunks, one every
+token_latency_ms; other replies are held back for the same total time.
+
+Usage as a library:
+    with FakeAzureServer(latency_ms=50) as server:
+        os.environ.update(server.env())
+        ...
+
+Or standalone, printing the env vars to export:
+    python benchmarks/fake_azure.py [--port N] [--latency-ms N] [--failure-rate X] [--token-latency-ms N]
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict
+
+FIELDS_RE = re.compile(r"Missing fields \(CSV column names\): (\[.*?\])\n")
+PATIENTS_RE = re.compile(r"Patients \(JSON[^)]*\): (\{.*\})\n")
+COUNT_RE = re.compile(r"Generate exactly (\d+) follow-up questions")
+LINES_MARKER = 'English lines start with "EN: "'
+# Characters per streamed delta chunk, roughly one token
+STREAM_CHUNK_CHARS = 4
+
+
+def _field_questions(fields, bilingual: bool) -> Dict:
+    en = {field: f"Could you tell us the {field} for this report?" for field in fields}
+    if not bilingual:
+        return en
+    hi = {field: f"कृपया इस रिपोर्ट के लिए {field} बताएं।" for field in fields}
+    return {"en": en, "hi": hi}
+
+
+def _answer(prompt: str) -> str:
+    """Model output for one of the generator prompts"""
+    patients_match = PATIENTS_RE.search(prompt)
+    if patients_match:
+        patients = json.loads(patients_match.group(1))
+        return json.dumps(
+            {pid: _field_questions(p["missing_fields"], True) for pid, p in patients.items()},
+            ensure_ascii=False,
+        )
+
+    fields_match = FIELDS_RE.search(prompt)
+    bilingual = '"hi"' in prompt
+    if fields_match:
+        return json.dumps(_field_questions(json.loads(fields_match.group(1)), bilingual), ensure_ascii=False)
+
+    count_match = COUNT_RE.search(prompt)
+    count = int(count_match.group(1)) if count_match else 3
+    en = [f"Follow-up question {i} about this reaction?" for i in range(1, count + 1)]
+    if LINES_MARKER in prompt:
+        hi = [f"इस प्रतिक्रिया के बारे में प्रश्न {i}?" for i in range(1, count + 1)]
+        return "\n".join([f"EN: {q}" for q in en] + [f"HI: {q}" for q in hi])
+    if not bilingual:
+        return json.dumps(en)
+    hi = [f"इस प्रतिक्रिया के बारे में प्रश्न {i}?" for i in range(1, count + 1)]
+    return json.dumps({"en": en, "hi": hi}, ensure_ascii=False)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # Bursts of concurrent clients overflow the default listen backlog of 5
+    request_queue_size = 128
+
+
+class FakeAzureServer:
+    """Threaded HTTP server on 127.0.0.1 answering chat completion requests"""
+
+    def __init__(self, port: int = 0, latency_ms: float = 0.0, failure_rate: float = 0.0, token_latency_ms: float = 0.0):
+        self.latency_ms = latency_ms
+        self.failure_rate = failure_rate
+        self.token_latency_ms = token_latency_ms
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = _Server(("127.0.0.1", port), self._handler_class())
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def env(self) -> Dict[str, str]:
+        """Environment variables pointing the Azure generators at this server"""
+        return {
+            "AZURE_ENDPOINT": self.url,
+            "AZURE_OPENAI_API_KEY": "fake-key",
+            "AZURE_API_VERSION": "2025-01-01-preview",
+            "AZURE_DEPLOYMENT": "fake-deployment",
+        }
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out in separate writes; without this, keep-alive
+            # clients stall on delayed ACKs for ~40 ms per request
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                with server._lock:
+                    server.requests += 1
+                if server.latency_ms:
+                    time.sleep(server.latency_ms / 1000.0)
+                if random.random() < server.failure_rate:
+                    self._reply(500, {"error": {"message": "fake failure"}})
+                    return
+                request = json.loads(body or b"{}")
+                messages = request.get("messages") or [{}]
+                content = _answer(messages[-1].get("content") or "")
+                usage = {
+                    "prompt_tokens": len(body) // 4,
+                    "completion_tokens": len(content) // 4,
+                    "total_tokens": (len(body) + len(content)) // 4,
+                }
+                if request.get("stream"):
+                    self._stream(content, usage)
+                    return
+                if server.token_latency_ms:
+                    # The model takes as long to generate a reply it sends in one piece
+                    chunks = -(-len(content) // STREAM_CHUNK_CHARS)
+                    time.sleep(chunks * server.token_latency_ms / 1000.0)
+                self._reply(200, {
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": content}}],
+                    "usage": usage,
+                })
+
+            def _stream(self, content: str, usage: Dict):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for start in range(0, len(content), STREAM_CHUNK_CHARS):
+                    if server.token_latency_ms:
+                        time.sleep(server.token_latency_ms / 1000.0)
+                    delta = content[start:start + STREAM_CHUNK_CHARS]
+                    self._event({"choices": [{"index": 0, "delta": {"content": delta}}]})
+                self._event({"choices": [], "usage": usage})
+                self._send_chunk(b"data: [DONE]\n\n")
+                self._send_chunk(b"")
+
+            def _event(self, payload: Dict):
+                self._send_chunk(b"data: " + json.dumps(payload, ensure_ascii=False).encode("utf-8") + b"\n\n")
+
+            def _send_chunk(self, data: bytes):
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                self.wfile.flush()
+
+            def _reply(self, status: int, payload: Dict):
+                data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "FakeAzureServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeAzureServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve fake Azure OpenAI chat completions locally")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--token-latency-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    fake = FakeAzureServer(args.port, args.latency_ms, args.failure_rate, args.token_latency_ms)
+    for name, value in fake.env().items():
+        print(f"export {name}={value}")
+    try:
+        fake.serve_forever()
+    except KeyboardInterrupt:
+        fake.stop()
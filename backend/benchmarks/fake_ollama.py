@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""Local stand-in for the Ollama /api/generate endpoint.
+
+Answers the follow-up question prompt of ai_engine/local_llm.py with one
+numbered question per line, one token every token_latency_ms, streamed as
+NDJSON when the request asks for it. Like Ollama it runs num_parallel
+generations at once and queues the rest, and it pays load_ms whenever the
+model is not loaded: on the first request and after keep_alive (default
+5m) has passed since the last one. Counters record requests, model loads,
+tokens generated and the most requests ever in flight.
+
+Usage as a library:
+    with FakeOllamaServer(token_latency_ms=5) as server:
+        os.environ.update(server.env())
+        ...
+
+Or standalone:
+    python benchmarks/fake_ollama.py [--port N] [--token-latency-ms N]
+        [--load-ms N] [--num-parallel N]
+"""
+
+import argparse
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+
+COUNT_RE = re.compile(r"Generate (\d+) concise")
+DRUG_RE = re.compile(r"Drug: (.*)\n")
+DEFAULT_KEEP_ALIVE_SECONDS = 300.0
+
+
+def _keep_alive_seconds(value) -> float:
+    """Ollama keep_alive: seconds as a number, or a duration like "30m" / "300s" / "1h" """
+    if value is None:
+        return DEFAULT_KEEP_ALIVE_SECONDS
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = re.fullmatch(r"\s*(-?[\d.]+)\s*([smh]?)\s*", str(value))
+    if not match:
+        return DEFAULT_KEEP_ALIVE_SECONDS
+    return float(match.group(1)) * {"": 1, "s": 1, "m": 60, "h": 3600}[match.group(2)]
+
+
+def _tokens(prompt: str) -> List[str]:
+    count_match = COUNT_RE.search(prompt)
+    count = int(count_match.group(1)) if count_match else 5
+    drug_match = DRUG_RE.search(prompt)
+    drug = drug_match.group(1).strip() if drug_match else "the drug"
+    text = "".join(f"{i}. Question {i} about the reaction to {drug}?\n" for i in range(1, count + 1))
+    # Roughly one token per word, keeping the separators
+    return re.findall(r"\S+\s*|\s+", text)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+class FakeOllamaServer:
+    """Threaded HTTP server on 127.0.0.1 answering /api/generate requests"""
+
+    def __init__(self, port: int = 0, token_latency_ms: float = 0.0, load_ms: float = 0.0, num_parallel: int = 1):
+        self.token_latency_ms = token_latency_ms
+        self.load_ms = load_ms
+        self._slots = threading.Semaphore(max(num_parallel, 1))
+        self._lock = threading.Lock()
+        self._loaded_until = 0.0
+        self.requests = 0
+        self.loads = 0
+        self.tokens = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._server = _Server(("127.0.0.1", port), self._handler_class())
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/api/generate"
+
+    def env(self) -> Dict[str, str]:
+        """Environment variables pointing local_llm at this server"""
+        return {"OLLAMA_URL": self.url}
+
+    def reset_counters(self):
+        with self._lock:
+            self.requests = self.loads = self.tokens = self.max_in_flight = 0
+
+    def _ensure_loaded(self, keep_alive: float):
+        with self._lock:
+            loaded = time.monotonic() < self._loaded_until
+            if not loaded:
+                self.loads += 1
+        if not loaded and self.load_ms:
+            time.sleep(self.load_ms / 1000.0)
+        with self._lock:
+            self._loaded_until = time.monotonic() + keep_alive if keep_alive > 0 else 0.0
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+                with server._lock:
+                    server.requests += 1
+                    server.in_flight += 1
+                    server.max_in_flight = max(server.max_in_flight, server.in_flight)
+                try:
+                    with server._slots:
+                        server._ensure_loaded(_keep_alive_seconds(body.get("keep_alive")))
+                        self._generate(body)
+                finally:
+                    with server._lock:
+                        server.in_flight -= 1
+
+            def _generate(self, body: Dict):
+                tokens = _tokens(body.get("prompt") or "")
+                model = body.get("model") or "fake"
+                if not body.get("stream", True):
+                    for _ in tokens:
+                        self._next_token()
+                    self._reply({"model": model, "response": "".join(tokens), "done": True})
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                try:
+                    for token in tokens:
+                        self._next_token()
+                        self._send_line({"model": model, "response": token, "done": False})
+                    self._send_line({"model": model, "response": "", "done": True})
+                    self.wfile.write(b"0\r\n\r\n")
+                    self.wfile.flush()
+                except (BrokenPipeError, ConnectionResetError):
+                    # Client hung up; like Ollama, stop generating
+                    self.close_connection = True
+
+            def _next_token(self):
+                if server.token_latency_ms:
+                    time.sleep(server.token_latency_ms / 1000.0)
+                with server._lock:
+                    server.tokens += 1
+
+            def _send_line(self, payload: Dict):
+                data = json.dumps(payload).encode("utf-8") + b"\n"
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                self.wfile.flush()
+
+            def _reply(self, payload: Dict):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "FakeOllamaServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeOllamaServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve fake Ollama /api/generate locally")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--token-latency-ms", type=float, default=0.0)
+    parser.add_argument("--load-ms", type=float, default=0.0)
+    parser.add_argument("--num-parallel", type=int, default=1)
+    args = parser.parse_args()
+
+    fake = FakeOllamaServer(args.port, args.token_latency_ms, args.load_ms, args.num_parallel)
+    print(f"export OLLAMA_URL={fake.url}")
+    try:
+        fake.serve_forever()
+    except KeyboardInterrupt:
+        fake.stop()
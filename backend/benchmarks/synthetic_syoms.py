@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""Generate synthetic syoms1.csv / missed_converted.csv pairs.
+
+The main file has the 23 SYOMS columns with values drawn from the same
+vocabularies as the shipped file (consistent drug/dose/indication, therapy
+dates and durations, ages derived from dates of birth). The missing file is
+a copy with cells blanked per column at the given rates; Case ID, Patient
+Initials and Contact no are never blanked, so every row can be matched.
+A small share of "keyless" rows, blank except for Contact no in both files,
+mirrors the blank rows in the shipped data.
+
+Usage:
+    python benchmarks/synthetic_syoms.py ROWS [--out DIR] [--missing-scale X]
+        [--keyless-rate X] [--seed N] [--shuffle]
+"""
+
+import argparse
+import os
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+COLUMNS = [
+    'Case ID', 'Patient Initials', 'Country', 'Date of Birth', 'Age (years)', 'Sex',
+    'Reaction Onset Date', 'Describe Reaction(s)', 'Outcome', 'Serious (Y/N)', 'Suspect Drug',
+    'Daily Dose', 'Route', 'Indication', 'Therapy Start Date', 'Therapy End Date',
+    'Therapy Duration', 'Abated After Stopping', 'Rechallenge Result', 'Concomitant Drug 1',
+    'Concomitant Drug 2', 'Medical History', 'Contact no',
+]
+
+# Share of cells blanked per column in the missing file, as in missed_converted.csv
+DEFAULT_MISSING_RATES = {
+    'Reaction Onset Date': 0.24,
+    'Outcome': 0.50,
+    'Serious (Y/N)': 1.00,
+    'Daily Dose': 0.43,
+    'Route': 0.43,
+    'Indication': 0.45,
+    'Therapy Start Date': 0.60,
+    'Therapy End Date': 0.56,
+    'Therapy Duration': 0.47,
+    'Abated After Stopping': 0.40,
+    'Rechallenge Result': 0.62,
+    'Concomitant Drug 1': 0.66,
+    'Concomitant Drug 2': 0.59,
+    'Medical History': 0.59,
+}
+NEVER_BLANKED = ('Case ID', 'Patient Initials', 'Contact no')
+
+# (drug, daily doses, indication)
+DRUGS = [
+    ('Metformin', ['500 mg', '1000 mg'], 'Diabetes management'),
+    ('Lisinopril', ['10 mg'], 'Hypertension control'),
+    ('Atorvastatin', ['40 mg'], 'Cholesterol management'),
+    ('Ciprofloxacin', ['500 mg', '750 mg'], 'Bacterial infection'),
+    ('Amoxicillin', ['500 mg'], 'Respiratory infection'),
+    ('Azithromycin', ['500 mg'], 'Respiratory infection'),
+    ('Ibuprofen', ['400 mg'], 'Inflammation control'),
+]
+REACTIONS = [
+    'Joint pain and muscle weakness', 'Breathlessness', 'Severe allergic reaction', 'Anaphylaxis',
+    'Hepatotoxicity indicators', 'Nausea and vomiting', 'Dizziness and headache',
+    'Photosensitivity rash', 'Abdominal pain', 'Severe rash and fever',
+]
+OUTCOMES = ['Recovering', 'Recover', 'Fatal / Recovering']
+SERIOUSNESS = ['HIGH RISK', 'LOW RISK']
+YES_NO = ['Yes', 'No']
+RECHALLENGE = ['Yes', 'No', 'Not tested']
+CONCOMITANT_1 = ['Aspirin', 'Paracetamol', 'Metoprolol', 'Cetirizine']
+CONCOMITANT_2 = ['Omeprazole', 'Iron supplement', 'Vitamin C', 'Vitamin D']
+HISTORY = [
+    'Hypertensive', 'No significant history', 'Diabetic', 'Arthritic', 'Asthmatic',
+    'Chronic liver disease',
+]
+REPORT_YEAR = 2026
+
+
+def _dates(days: np.ndarray, start: str) -> np.ndarray:
+    """DD/MM/YYYY strings for day offsets from start (formatting each distinct day once)"""
+    unique_days, inverse = np.unique(days, return_inverse=True)
+    labels = (pd.Timestamp(start) + pd.to_timedelta(unique_days, unit='D')).strftime('%d/%m/%Y')
+    return labels.to_numpy(dtype=object)[inverse]
+
+
+def _with_blanks(rng: np.random.Generator, values: list, blank_rate: float, rows: int) -> np.ndarray:
+    column = rng.choice(np.array(values, dtype=object), size=rows)
+    column[rng.random(rows) < blank_rate] = np.nan
+    return column
+
+
+def _daily_doses(rng: np.random.Generator, drug_idx: np.ndarray) -> np.ndarray:
+    doses = np.empty(len(drug_idx), dtype=object)
+    for k, (_, drug_doses, _) in enumerate(DRUGS):
+        rows = drug_idx == k
+        doses[rows] = rng.choice(np.array(drug_doses, dtype=object), size=int(rows.sum()))
+    return doses
+
+
+def generate_main(rows: int, rng: np.random.Generator, keyless_rate: float = 0.01) -> pd.DataFrame:
+    letters = np.array(list("ABCDEFGHIJKLMNOPQRSTUVWXYZ"), dtype=object)
+    birth_days = rng.integers(0, 365 * 65, size=rows)
+    dob = pd.Timestamp('1940-01-01') + pd.to_timedelta(birth_days, unit='D')
+    drug_idx = rng.integers(0, len(DRUGS), size=rows)
+    start_days = rng.integers(0, 20, size=rows)
+    durations = rng.integers(5, 11, size=rows)
+
+    main_df = pd.DataFrame({
+        'Case ID': np.array([f"CASE-{REPORT_YEAR}-{i:07d}" for i in range(1, rows + 1)], dtype=object),
+        'Patient Initials': letters[rng.integers(0, 26, size=rows)] + letters[rng.integers(0, 26, size=rows)],
+        'Country': 'IN',
+        'Date of Birth': _dates(birth_days, '1940-01-01'),
+        'Age (years)': (REPORT_YEAR - dob.year).astype(float),
+        'Sex': rng.choice(np.array(['F', 'M'], dtype=object), size=rows),
+        'Reaction Onset Date': _dates(rng.integers(1, 25, size=rows), f'{REPORT_YEAR}-01-01'),
+        'Describe Reaction(s)': rng.choice(np.array(REACTIONS, dtype=object), size=rows),
+        'Outcome': rng.choice(np.array(OUTCOMES, dtype=object), size=rows),
+        'Serious (Y/N)': rng.choice(np.array(SERIOUSNESS, dtype=object), size=rows),
+        'Suspect Drug': np.array([drug for drug, _, _ in DRUGS], dtype=object)[drug_idx],
+        'Daily Dose': _daily_doses(rng, drug_idx),
+        'Route': 'Oral',
+        'Indication': np.array([indication for _, _, indication in DRUGS], dtype=object)[drug_idx],
+        'Therapy Start Date': _dates(start_days, f'{REPORT_YEAR}-01-01'),
+        'Therapy End Date': _dates(start_days + durations, f'{REPORT_YEAR}-01-01'),
+        'Therapy Duration': np.array([f"{d} days" for d in durations], dtype=object),
+        'Abated After Stopping': _with_blanks(rng, YES_NO, 0.3, rows),
+        'Rechallenge Result': _with_blanks(rng, RECHALLENGE, 0.15, rows),
+        'Concomitant Drug 1': rng.choice(np.array(CONCOMITANT_1, dtype=object), size=rows),
+        'Concomitant Drug 2': rng.choice(np.array(CONCOMITANT_2, dtype=object), size=rows),
+        'Medical History': rng.choice(np.array(HISTORY, dtype=object), size=rows),
+        'Contact no': 6000000000 + rng.choice(3999999999, size=rows, replace=False),
+    }, columns=COLUMNS)
+
+    keyless = rng.random(rows) < keyless_rate
+    main_df.loc[keyless, COLUMNS[:-1]] = np.nan
+    return main_df
+
+
+def generate_missing(main_df: pd.DataFrame, rng: np.random.Generator,
+                     missing_rates: Optional[Dict[str, float]] = None, missing_scale: float = 1.0,
+                     shuffle: bool = False) -> pd.DataFrame:
+    rates = DEFAULT_MISSING_RATES if missing_rates is None else missing_rates
+    missing_df = main_df.copy()
+    rows = len(missing_df)
+    for column, rate in rates.items():
+        if column in NEVER_BLANKED:
+            continue
+        blank = rng.random(rows) < min(rate * missing_scale, 1.0)
+        missing_df.loc[blank, column] = np.nan
+    if shuffle:
+        missing_df = missing_df.iloc[rng.permutation(rows)].reset_index(drop=True)
+    return missing_df
+
+
+def generate_pair(rows: int, missing_rates: Optional[Dict[str, float]] = None, missing_scale: float = 1.0,
+                  keyless_rate: float = 0.01, seed: int = 0, shuffle: bool = False) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Return (main_df, missing_df) with `rows` rows each"""
+    rng = np.random.default_rng(seed)
+    main_df = generate_main(rows, rng, keyless_rate)
+    return main_df, generate_missing(main_df, rng, missing_rates, missing_scale, shuffle)
+
+
+def write_pair(rows: int, out_dir: str, **kwargs) -> Tuple[str, str]:
+    """Write syoms1.csv and missed_converted.csv into out_dir and return their paths"""
+    main_df, missing_df = generate_pair(rows, **kwargs)
+    os.makedirs(out_dir, exist_ok=True)
+    main_path = os.path.join(out_dir, "syoms1.csv")
+    missing_path = os.path.join(out_dir, "missed_converted.csv")
+    main_df.to_csv(main_path, index=False)
+    missing_df.to_csv(missing_path, index=False)
+    return main_path, missing_path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic SYOMS main/missing CSV pair")
+    parser.add_argument("rows", type=int)
+    parser.add_argument("--out", default="synthetic_data", help="output directory")
+    parser.add_argument("--missing-scale", type=float, default=1.0,
+                        help="multiplier applied to every per-column missing rate")
+    parser.add_argument("--keyless-rate", type=float, default=0.01,
+                        help="share of rows blank except for Contact no")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--shuffle", action="store_true", help="shuffle the missing file's row order")
+    args = parser.parse_args()
+
+    paths = write_pair(
+        args.rows, args.out, missing_scale=args.missing_scale,
+        keyless_rate=args.keyless_rate, seed=args.seed, shuffle=args.shuffle,
+    )
+    print(f"Wrote {args.rows:,} rows to {paths[0]} and {paths[1]}")
@@ -0,0 +1,153 @@
+import asyncio
+import json
+import traceback
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from database import SessionLocal
+from models.case_model import Case
+
+# Case.questions_status values
+PENDING = "pending"
+READY = "ready"
+FALLBACK = "fallback"  # Rule-based questions, no LLM backend answered in time
+
+DEFAULT_CONCURRENCY = 4
+
+# (drug_name, reaction, language) -> (English questions, Hindi questions, status)
+GenerateQuestions = Callable[[str, str, str], Awaitable[Tuple[List[str], List[str], str]]]
+
+
+def _pending_case_ids() -> List[int]:
+    db = SessionLocal()
+    try:
+        rows = db.query(Case.id).filter(Case.questions_status == PENDING).order_by(Case.id).all()
+        return [row.id for row in rows]
+    finally:
+        db.close()
+
+
+def _load_case_inputs(case_id: int) -> Optional[Tuple[str, str, str]]:
+    db = SessionLocal()
+    try:
+        case = db.query(Case).filter(Case.id == case_id).first()
+        if case is None or case.questions_status != PENDING:
+            return None
+        return case.drug_name, case.reaction, case.language or "en"
+    finally:
+        db.close()
+
+
+def store_case_questions(case_id: int, questions: List[str], questions_hi: List[str], status: str):
+    db = SessionLocal()
+    try:
+        db.query(Case).filter(Case.id == case_id).update({
+            Case.follow_up_questions: json.dumps(questions, ensure_ascii=False),
+            Case.follow_up_questions_hi: json.dumps(questions_hi, ensure_ascii=False),
+            Case.questions_status: status,
+        })
+        db.commit()
+    finally:
+        db.close()
+
+
+def load_case_questions(case_id: int) -> Optional[Dict]:
+    """Generation status and questions of a case, or None if there is no such case"""
+    db = SessionLocal()
+    try:
+        case = db.query(Case).filter(Case.id == case_id).first()
+        if case is None:
+            return None
+        return {
+            "case_id": case.id,
+            "questions_status": case.questions_status,
+            "follow_up_questions": json.loads(case.follow_up_questions or "[]"),
+            "follow_up_questions_hi": json.loads(case.follow_up_questions_hi or "[]"),
+        }
+    finally:
+        db.close()
+
+
+class CaseQuestionWorker:
+    """Generates follow-up questions for saved cases off the request path.
+
+    /submit-case stores the case as pending and returns; submit() queues its
+    id and one of `concurrency` tasks on the event loop generates the English
+    and Hindi questions and writes them to the case row. resume_pending()
+    queues cases left pending by a previous process, so a case saved before
+    Azure answered always gets its questions.
+    """
+
+    def __init__(self, generate: GenerateQuestions, concurrency: int = DEFAULT_CONCURRENCY):
+        self.generate = generate
+        self.concurrency = max(concurrency, 1)
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._queued: Set[int] = set()
+        self.completed = 0
+        self.fallbacks = 0
+        self.failed = 0
+
+    def start(self):
+        """Start the worker tasks on the running event loop (no-op once started)"""
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.concurrency)]
+
+    async def stop(self):
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._queued.clear()
+
+    def submit(self, case_id: int):
+        self.start()
+        if case_id in self._queued:
+            return
+        self._queued.add(case_id)
+        self._queue.put_nowait(case_id)
+
+    async def resume_pending(self) -> int:
+        """Queue every case still pending in the database; returns how many"""
+        case_ids = await asyncio.to_thread(_pending_case_ids)
+        for case_id in case_ids:
+            self.submit(case_id)
+        return len(case_ids)
+
+    async def join(self):
+        """Wait until every queued case has been processed"""
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def _work(self):
+        while True:
+            case_id = await self._queue.get()
+            try:
+                await self._process(case_id)
+            except Exception:
+                # The case stays pending and is retried by the next resume_pending()
+                traceback.print_exc()
+                self.failed += 1
+            finally:
+                self._queued.discard(case_id)
+                self._queue.task_done()
+
+    async def _process(self, case_id: int):
+        inputs = await asyncio.to_thread(_load_case_inputs, case_id)
+        if inputs is None:
+            return  # Deleted, or answered elsewhere (e.g. by /submit-case/stream)
+        questions, questions_hi, status = await self.generate(*inputs)
+        await asyncio.to_thread(store_case_questions, case_id, questions, questions_hi, status)
+        self.completed += 1
+        if status == FALLBACK:
+            self.fallbacks += 1
+
+    def stats(self) -> Dict:
+        return {
+            "workers": len(self._tasks),
+            "queued": len(self._queued),
+            "completed": self.completed,
+            "fallbacks": self.fallbacks,
+            "failed": self.failed,
+        }
@@ -0,0 +1,149 @@
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Optional
+
+from patient_data_comparator import ComparisonCancelled, PatientDataComparator
+
+# Finished jobs kept for the progress and result endpoints
+DEFAULT_MAX_FINISHED_JOBS = 100
+DEFAULT_FINISHED_JOB_TTL_SECONDS = 24 * 3600
+
+
+class ComparisonJob:
+    """One background comparator run and the state reported by the progress API.
+
+    The comparator (and the frames it loaded) is dropped once the job
+    finishes; only a copy of its final progress is kept.
+    """
+
+    def __init__(self, comparator: PatientDataComparator):
+        self.job_id = uuid.uuid4().hex
+        self.comparator: Optional[PatientDataComparator] = comparator
+        self.progress = comparator.progress
+        self.cancel_event = comparator.cancel_event
+        self.status = "queued"  # queued, running, completed, failed, cancelled
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.result: Optional[Dict] = None
+        self.error: Optional[str] = None
+        self.future: Optional[Future] = None
+
+    def eta_seconds(self) -> Optional[float]:
+        """Linear estimate for the current stage: patients while comparing,
+        Azure template calls while generating questions.
+        """
+        progress = self.progress
+        if progress['stage'] == 'generating_questions':
+            done, total = progress['templates_generated'], progress['templates_total']
+        else:
+            done, total = progress['processed'], progress['total']
+        if self.status != "running" or not done or not total or not progress['stage_started_at']:
+            return None
+        elapsed = time.time() - progress['stage_started_at']
+        return round(elapsed / done * max(total - done, 0), 1)
+
+    def finish(self, status: str):
+        self.status = status
+        self.finished_at = time.time()
+        self.progress = dict(self.progress)
+        self.comparator = None
+
+    def to_dict(self) -> Dict:
+        progress = self.progress
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "stage": progress['stage'],
+            "patients_processed": progress['processed'],
+            "total_patients": progress['total'],
+            "questions_generated": progress['questions_generated'],
+            "azure_calls_done": progress['templates_generated'],
+            "azure_calls_total": progress['templates_total'],
+            "eta_seconds": self.eta_seconds(),
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "error": self.error,
+        }
+
+
+class ComparisonJobManager:
+    """Runs comparator jobs on a background thread, one at a time by default,
+    so the comparator never blocks the event loop serving other endpoints.
+
+    Finished jobs are forgotten after finished_ttl_seconds, and beyond the
+    newest max_finished of them.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 1,
+        max_finished: int = DEFAULT_MAX_FINISHED_JOBS,
+        finished_ttl_seconds: float = DEFAULT_FINISHED_JOB_TTL_SECONDS,
+    ):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="comparison-job")
+        self._jobs: Dict[str, ComparisonJob] = {}
+        self._lock = threading.Lock()
+        self.max_finished = max_finished
+        self.finished_ttl_seconds = finished_ttl_seconds
+
+    def _evict_finished(self):
+        """Drop expired finished jobs, then the oldest ones over max_finished; call with the lock held"""
+        cutoff = time.time() - self.finished_ttl_seconds
+        finished = sorted(
+            (job for job in self._jobs.values() if job.finished_at is not None),
+            key=lambda job: job.finished_at,
+        )
+        excess = len(finished) - self.max_finished
+        for k, job in enumerate(finished):
+            if k < excess or job.finished_at < cutoff:
+                del self._jobs[job.job_id]
+
+    def submit(self, comparator: PatientDataComparator) -> ComparisonJob:
+        job = ComparisonJob(comparator)
+        with self._lock:
+            self._evict_finished()
+            self._jobs[job.job_id] = job
+            job.future = self._executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id: str) -> Optional[ComparisonJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[ComparisonJob]:
+        """Cancel a queued job outright, or ask a running one to stop at its next progress point"""
+        job = self.get(job_id)
+        if job is None:
+            return None
+        job.cancel_event.set()
+        if job.status == "queued" and job.future.cancel():
+            job.finish("cancelled")
+        return job
+
+    def _run(self, job: ComparisonJob):
+        if job.cancel_event.is_set():
+            job.finish("cancelled")
+            return
+        job.status = "running"
+        job.started_at = time.time()
+        status = "failed"
+        try:
+            job.result = job.comparator.run()
+            status = "completed"
+        except ComparisonCancelled:
+            status = "cancelled"
+        except Exception as e:
+            traceback.print_exc()
+            job.error = str(e)
+        finally:
+            job.finish(status)
+            with self._lock:
+                self._evict_finished()
+
+
+comparison_jobs = ComparisonJobManager()
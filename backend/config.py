@@ -0,0 +1,19 @@
+import os
+from typing import Optional
+
+
+def env(name: str) -> Optional[str]:
+    """Environment variable with surrounding whitespace and quotes removed, or None if unset or empty"""
+    value = os.getenv(name)
+    if value is None:
+        return None
+    value = value.strip()
+    if len(value) >= 2 and ((value[0] == value[-1]) and value[0] in ('"', "'")):
+        value = value[1:-1]
+    return value.strip() or None
+
+
+def env_int(name: str, default: Optional[int] = None) -> Optional[int]:
+    """Non-negative integer environment variable, or default if unset or not a number"""
+    value = env(name) or ""
+    return int(value) if value.isdigit() else default
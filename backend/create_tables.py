@@ -7,12 +7,25 @@ import os
 # Add the parent directory to the path to import the database module
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from database import Base, engine
-from models.patient_comparison_model import PatientComparison, PatientResponse, PatientSummary
+from models.patient_comparison_model import (
+    PatientComparison,
+    PatientResponse,
+    PatientSummary,
+    QuestionTemplate,
+    ComparisonFingerprint,
+    ComparisonCheckpoint,
+    ComparisonColumnDictionary,
+    PatientMissingField,
+)
+from missing_field_mask import backfill_legacy_masks
 
 def create_tables():
     """Create all database tables"""
     print("Creating database tables...")
     Base.metadata.create_all(bind=engine)
+    converted = backfill_legacy_masks()
+    if converted:
+        print(f"Converted {converted} comparisons to missing-field masks")
     print("Tables created successfully!")
 
 if __name__ == "__main__":
@@ -0,0 +1,129 @@
+import hashlib
+import json
+import os
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow.feather as feather
+except ImportError:  # pyarrow is optional; fall back to pickled frames
+    feather = None
+
+# Bump when the cached representation changes so old caches are rebuilt
+CACHE_FORMAT_VERSION = "1"
+HASH_BLOCK_SIZE = 1 << 20
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class CsvCache:
+    """Typed binary copy of a CSV kept next to it, so repeat loads skip the text parse.
+
+    The cache holds exactly what pd.read_csv returned (same dtypes, NaN for
+    empty cells) as Feather when pyarrow is installed, memory-mapped on read,
+    or as a pickle otherwise. A sidecar JSON records the CSV's size, mtime and
+    SHA-256: matching size and mtime reuse the cache directly, and a changed
+    mtime with unchanged content only refreshes the sidecar.
+    """
+
+    def __init__(self, csv_path: str):
+        self.csv_path = csv_path
+        self.meta_path = f"{csv_path}.cache.json"
+        self.format = "feather" if feather is not None else "pickle"
+        self.data_path = f"{csv_path}.{self.format}"
+
+    def _expected_meta(self) -> Dict:
+        return {
+            "version": CACHE_FORMAT_VERSION,
+            "pandas": pd.__version__,
+            "format": self.format,
+        }
+
+    def _read_meta(self) -> Optional[Dict]:
+        try:
+            with open(self.meta_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_meta(self, meta: Dict):
+        tmp_path = f"{self.meta_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self.meta_path)
+
+    def _is_valid(self, meta: Optional[Dict], stat: os.stat_result) -> bool:
+        if not meta or not os.path.exists(self.data_path):
+            return False
+        if any(meta.get(key) != value for key, value in self._expected_meta().items()):
+            return False
+        if meta.get("size") != stat.st_size:
+            return False
+        if meta.get("mtime_ns") == stat.st_mtime_ns:
+            return True
+        # Touched or copied but possibly unchanged: compare content before rebuilding
+        if meta.get("sha256") != _file_sha256(self.csv_path):
+            return False
+        meta["mtime_ns"] = stat.st_mtime_ns
+        try:
+            self._write_meta(meta)
+        except OSError:
+            pass  # Still valid; the content is hashed again next time
+        return True
+
+    def _read_data(self) -> pd.DataFrame:
+        if self.format == "pickle":
+            return pd.read_pickle(self.data_path)
+        df = feather.read_table(self.data_path, memory_map=True).to_pandas()
+        # Arrow hands back missing strings as None; use NaN like read_csv does
+        for column in df.columns:
+            if df[column].dtype == object:
+                df[column] = df[column].where(df[column].notna(), np.nan)
+        return df
+
+    def _write_data(self, df: pd.DataFrame):
+        tmp_path = f"{self.data_path}.tmp"
+        try:
+            if self.format == "pickle":
+                df.to_pickle(tmp_path)
+            else:
+                feather.write_feather(df, tmp_path)
+            os.replace(tmp_path, self.data_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def load(self) -> pd.DataFrame:
+        """Return the CSV as a DataFrame, from the cache when it is still valid"""
+        stat = os.stat(self.csv_path)
+        if self._is_valid(self._read_meta(), stat):
+            try:
+                return self._read_data()
+            except Exception as e:
+                print(f"Ignoring unreadable cache {self.data_path}: {e}")
+
+        df = pd.read_csv(self.csv_path)
+        try:
+            self._write_data(df)
+            self._write_meta({
+                **self._expected_meta(),
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "sha256": _file_sha256(self.csv_path),
+            })
+        except Exception as e:
+            # Read-only directory, or columns Arrow cannot type: keep working from the CSV
+            print(f"Could not write cache for {self.csv_path}: {e}")
+        return df
+
+
+def read_csv_cached(csv_path: str) -> pd.DataFrame:
+    return CsvCache(csv_path).load()
@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.orm import sessionmaker, declarative_base
 
 DATABASE_URL = "sqlite:///./pv.db"
@@ -15,3 +15,23 @@ SessionLocal = sessionmaker(
 )
 
 Base = declarative_base()
+
+# Keys bound per "IN (...)" query, well below SQLite's parameter limit
+SQL_IN_BATCH_SIZE = 500
+
+
+def add_missing_columns(table):
+    """Add columns declared on a model but absent from its existing table.
+
+    create_all only creates missing tables, so columns added to a model
+    later are added here with ALTER TABLE (nullable, no default).
+    """
+    inspector = inspect(engine)
+    if not inspector.has_table(table.name):
+        return
+    existing = {column["name"] for column in inspector.get_columns(table.name)}
+    with engine.begin() as conn:
+        for column in table.columns:
+            if column.name not in existing:
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN "{column.name}" {column_type}'))
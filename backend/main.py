@@ -1,26 +1,40 @@
-from fastapi import FastAPI
+import json
+from fastapi import FastAPI, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from pathlib import Path
 from dotenv import load_dotenv
-from database import Base, engine, SessionLocal
+from database import Base, engine, SessionLocal, add_missing_columns
 from models.case_model import Case
 # from ai_engine.question_generator import generate_followup_questions
 # from notification_service import send_sms, make_call
 # from ai_engine.nlp_transformer import extract_medical_features
 # from ai_engine.risk_predictor import predict_risk_probability
 # from ai_engine.llm_question_generator import generate_llm_followup_questions
-from ai_engine.azure_question_generator import (
-    generate_azure_followup_questions,
-    generate_azure_followup_questions_bilingual,
-)
+from ai_engine.azure_question_generator import stream_azure_followup_questions_bilingual
+from ai_engine.azure_client import azure_health, azure_metrics, close_async_azure_client
+from ai_engine.followup_cache import get_followup_cache
+from ai_engine.question_orchestrator import GENERIC_QUESTIONS, get_question_orchestrator
+from ai_engine.local_llm import get_ollama_client
 from database import Base, engine
 # from models.user_model import User
 from routes.excel_routes import router as excel_router
 from routes.patient_routes import router as patient_router
 from routes.patient_interface_routes import router as patient_interface_router
+from missing_field_mask import backfill_legacy_masks
+from translation_cache import get_translation_cache
+from case_questions import (
+    FALLBACK,
+    PENDING,
+    READY,
+    CaseQuestionWorker,
+    load_case_questions,
+    store_case_questions,
+)
 
 
 
@@ -29,6 +43,10 @@ from routes.patient_interface_routes import router as patient_interface_router
 load_dotenv(dotenv_path=Path(__file__).resolve().parent.parent / ".env")
 
 Base.metadata.create_all(bind=engine)
+# Older pv.db files: add the language and follow-up question columns to cases
+add_missing_columns(Case.__table__)
+# Older pv.db files: add the missing-field mask columns and convert JSON rows
+backfill_legacy_masks()
 
 app = FastAPI()
 app.include_router(excel_router)
@@ -59,15 +77,72 @@ def classify_risk(reaction: str):
     return "LOW RISK"
 
 def generate_questions():
-    return [
-        "Did the reaction worsen?",
-        "Did you consult a doctor?",
-        "Did symptoms improve after stopping the drug?"
-    ]
+    return list(GENERIC_QUESTIONS)
 
-@app.post("/submit-case")
-def submit_case(case: CaseInput):
+# Backends whose questions count as generated rather than rule-based
+LLM_BACKENDS = {"azure", "ollama"}
+
+
+async def _generate_case_questions(drug_name: str, reaction: str, language: str):
+    """English and Hindi questions for a case: the best the question backends
+    (Azure, Ollama, rule-based) produce.
+
+    This runs in the worker after /submit-case has answered, so it is not
+    held to QUESTION_BUDGET_MS: a slow Azure reply still wins over the
+    fallbacks instead of leaving the case with them for good.
+    """
+    result = await get_question_orchestrator().generate(
+        drug_name,
+        reaction,
+        language=language,
+        n_questions=3,
+        budgeted=False,
+    )
+    if result is None:
+        return generate_questions(), [], FALLBACK
+    status = READY if result.backend in LLM_BACKENDS else FALLBACK
+    return result.questions, result.questions_hi, status
+
+
+case_question_worker = CaseQuestionWorker(_generate_case_questions)
+
+
+@app.on_event("startup")
+async def start_case_question_worker():
+    case_question_worker.start()
+    # Cases saved by a previous process that never got their questions
+    await case_question_worker.resume_pending()
+
+
+@app.on_event("shutdown")
+async def close_azure_connections():
+    await case_question_worker.stop()
+    await close_async_azure_client()
+
+
+def _save_case(case: CaseInput, risk: str) -> int:
     db = SessionLocal()
+    try:
+        new_case = Case(
+            drug_name=case.drug_name,
+            reaction=case.reaction,
+            risk_level=risk,
+            follow_up_answers="",
+            phone=case.phone,
+            language=case.language,
+            questions_status=PENDING,
+        )
+
+        db.add(new_case)
+        db.commit()
+        db.refresh(new_case)
+        return new_case.id
+    finally:
+        db.close()
+
+
+@app.post("/submit-case")
+async def submit_case(case: CaseInput):
     # nlp_features = extract_medical_features(case.reaction)
     # print("NLP FEATURES:", nlp_features)
 
@@ -82,53 +157,148 @@ def submit_case(case: CaseInput):
     # case.language 
     # )
 
-    follow_up_questions_hi = []
-    try:
-        bilingual = generate_azure_followup_questions_bilingual(
-            case.drug_name,
-            case.reaction,
-            n_questions=3,
-        )
-        questions = bilingual.get("en") or []
-        follow_up_questions_hi = bilingual.get("hi") or []
-    except Exception:
+    # The case is saved before any Azure call, so a timeout can never lose it;
+    # questions are generated in the background (GET /cases/{case_id}/questions).
+    # Database work stays off the event loop
+    case_id = await run_in_threadpool(_save_case, case, risk)
+    case_question_worker.submit(case_id)
+
+    # if risk == "HIGH RISK":
+    #     send_sms(
+    #         case.phone,
+    #         f"URGENT: Severe reaction detected for {case.drug_name}. Please seek medical attention immediately."
+    #     )
+    #     make_call(case.phone)
+
+    return {
+        "case_id": case_id,
+        "risk_level": risk,
+        "questions_status": PENDING,
+        "follow_up_questions": [],
+        "follow_up_questions_hi": [],
+    }
+
+
+@app.get("/cases/{case_id}/questions")
+async def get_case_questions(case_id: int):
+    """Follow-up questions of a submitted case; questions_status stays "pending" until they are generated"""
+    questions = await run_in_threadpool(load_case_questions, case_id)
+    if questions is None:
+        raise HTTPException(status_code=404, detail="Case not found")
+    return questions
+
+
+@app.post("/submit-case/stream")
+async def submit_case_stream(case: CaseInput):
+    """/submit-case as NDJSON, one event per line, so the reporter sees questions as they arrive:
+
+    {"type": "case", "case_id", "risk_level"}                  once the case is saved
+    {"type": "question", "language", "index", "question"}      per question, English then Hindi
+    {"type": "done", "questions_status", "follow_up_questions", "follow_up_questions_hi"}
+
+    If Azure yields no English question, the best questions the other backends
+    produce within QUESTION_BUDGET_MS are sent instead. If it stops short of
+    three English and three Hindi questions, the case stays "pending" and the
+    worker generates complete ones. The questions are stored on the case like
+    those of /submit-case.
+    """
+    risk = "LOW RISK"  # Simplified for now
+    case_id = await run_in_threadpool(_save_case, case, risk)
+
+    def event(payload: dict) -> str:
+        return json.dumps(payload, ensure_ascii=False) + "\n"
+
+    async def events():
+        yield event({"type": "case", "case_id": case_id, "risk_level": risk})
+        questions = {"en": [], "hi": []}
+        status = READY
         try:
-            questions = generate_azure_followup_questions(
+            async for language, question in stream_azure_followup_questions_bilingual(
+                case.drug_name,
+                case.reaction,
+                n_questions=3,
+            ):
+                questions[language].append(question)
+                yield event({
+                    "type": "question",
+                    "language": language,
+                    "index": len(questions[language]) - 1,
+                    "question": question,
+                })
+        except Exception:
+            pass
+        if not questions["en"]:
+            # The reporter is waiting on this one, so it is held to the budget
+            result = await get_question_orchestrator().generate(
                 case.drug_name,
                 case.reaction,
                 language=case.language,
                 n_questions=3,
             )
-        except Exception:
-            questions = generate_questions()
-
-    new_case = Case(
-        drug_name=case.drug_name,
-        reaction=case.reaction,
-        risk_level=risk,
-        follow_up_answers="",
-        phone=case.phone
-    )
+            if result is None:
+                fallback, status = {"en": generate_questions(), "hi": []}, FALLBACK
+            else:
+                fallback = {"en": result.questions, "hi": result.questions_hi}
+                status = READY if result.backend in LLM_BACKENDS else FALLBACK
+            for language in ("en", "hi"):
+                for question in fallback[language]:
+                    questions[language].append(question)
+                    yield event({
+                        "type": "question",
+                        "language": language,
+                        "index": len(questions[language]) - 1,
+                        "question": question,
+                    })
+        elif len(questions["en"]) < 3 or len(questions["hi"]) < 3:
+            status = PENDING
+        await run_in_threadpool(store_case_questions, case_id, questions["en"], questions["hi"], status)
+        if status == PENDING:
+            case_question_worker.submit(case_id)
+        yield event({
+            "type": "done",
+            "questions_status": status,
+            "follow_up_questions": questions["en"],
+            "follow_up_questions_hi": questions["hi"],
+        })
 
-    db.add(new_case)
-    db.commit()
-    db.refresh(new_case)
+    async def events_or_background():
+        stored = False
+        try:
+            async for line in events():
+                yield line
+            stored = True
+        finally:
+            if not stored:
+                # Client went away mid-stream: the worker generates the questions instead
+                case_question_worker.submit(case_id)
 
-    
-    # if risk == "HIGH RISK":
-    #     send_sms(
-    #         case.phone,
-    #         f"URGENT: Severe reaction detected for {case.drug_name}. Please seek medical attention immediately."
-    #     )
-    #     make_call(case.phone)
+    return StreamingResponse(events_or_background(), media_type="application/x-ndjson")
 
-    db.close()
 
+@app.get("/azure/metrics")
+def get_azure_metrics():
+    """Call counts, retries, latency and token usage of the shared Azure client"""
+    return azure_metrics()
+
+
+@app.get("/questions/metrics")
+def get_question_metrics():
+    """Per-backend latency, failures and win rates of the question orchestrator,
+    and the Ollama client's queueing and cache counters
+    """
+    return {**get_question_orchestrator().snapshot(), "ollama": get_ollama_client().snapshot()}
+
+
+@app.get("/health")
+def health():
+    """Service health: "degraded" while the Azure circuit is not closed (fallback questions are served)"""
+    azure = azure_health()
     return {
-        "case_id": new_case.id,
-        "risk_level": risk,
-        "follow_up_questions": questions,
-        "follow_up_questions_hi": follow_up_questions_hi,
+        "status": "ok" if azure["circuit"]["state"] == "closed" else "degraded",
+        "azure": azure,
+        "followup_cache": get_followup_cache().stats(),
+        "case_questions": case_question_worker.stats(),
+        "translation_cache": get_translation_cache().stats(),
     }
 
 
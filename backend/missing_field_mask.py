@@ -0,0 +1,162 @@
+import json
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import bindparam, insert, update
+from sqlalchemy.orm import Session
+
+from database import SessionLocal, add_missing_columns, engine
+from models.patient_comparison_model import (
+    ComparisonColumnDictionary,
+    PatientComparison,
+    PatientMissingField,
+)
+
+# SQLite integers are signed 64-bit
+MAX_MASK_COLUMNS = 63
+# Legacy rows converted per transaction by backfill_legacy_masks
+BACKFILL_CHUNK_SIZE = 5000
+
+
+def ensure_mask_schema():
+    """Create the dictionary/index tables and add the mask columns to older pv.db files"""
+    ComparisonColumnDictionary.__table__.create(bind=engine, checkfirst=True)
+    PatientMissingField.__table__.create(bind=engine, checkfirst=True)
+    add_missing_columns(PatientComparison.__table__)
+
+
+def get_dictionary_version(db: Session, columns: List[str]) -> int:
+    """Version of the column dictionary for this exact column order, creating it if new"""
+    encoded = json.dumps(list(columns), ensure_ascii=False)
+    version = db.query(ComparisonColumnDictionary.version).filter(
+        ComparisonColumnDictionary.columns == encoded
+    ).scalar()
+    if version is None:
+        dictionary = ComparisonColumnDictionary(columns=encoded)
+        db.add(dictionary)
+        db.flush()
+        version = dictionary.version
+    return version
+
+
+def load_dictionaries(db: Session) -> Dict[int, List[str]]:
+    return {
+        version: json.loads(columns)
+        for version, columns in db.query(ComparisonColumnDictionary.version, ComparisonColumnDictionary.columns)
+    }
+
+
+def encode_mask(fields: Iterable[str], bits: Dict[str, int]) -> int:
+    mask = 0
+    for field in fields:
+        mask |= 1 << bits[field]
+    return mask
+
+
+def missing_field_rows(comparison_id: int, version: Optional[int], mask: Optional[int]) -> List[Dict]:
+    """patient_missing_fields rows for one comparison's mask"""
+    if not mask:
+        return []
+    return [
+        {'column_dictionary_version': version, 'bit': bit, 'comparison_id': comparison_id}
+        for bit in range(mask.bit_length())
+        if mask >> bit & 1
+    ]
+
+
+def delete_missing_field_rows(db: Session, rows: List[Dict]):
+    """Delete the given patient_missing_fields rows by primary key"""
+    if not rows:
+        return
+    table = PatientMissingField.__table__
+    db.execute(
+        table.delete().where(
+            table.c.column_dictionary_version == bindparam('key_version'),
+            table.c.bit == bindparam('key_bit'),
+            table.c.comparison_id == bindparam('key_comparison_id'),
+        ),
+        [
+            {'key_version': row['column_dictionary_version'], 'key_bit': row['bit'],
+             'key_comparison_id': row['comparison_id']}
+            for row in rows
+        ],
+    )
+
+
+def patients_missing_field(db: Session, field_name: str) -> List[Dict]:
+    """Patients missing field_name, answered from the patient_missing_fields index"""
+    positions = [
+        (version, columns.index(field_name))
+        for version, columns in load_dictionaries(db).items()
+        if field_name in columns
+    ]
+    patients = []
+    for version, bit in positions:
+        rows = db.query(
+            PatientComparison.case_id, PatientComparison.patient_initials, PatientComparison.contact_no
+        ).join(
+            PatientMissingField, PatientMissingField.comparison_id == PatientComparison.id
+        ).filter(
+            PatientMissingField.column_dictionary_version == version,
+            PatientMissingField.bit == bit,
+        )
+        patients.extend(
+            {'case_id': case_id, 'patient_initials': patient_initials, 'contact_no': contact_no}
+            for case_id, patient_initials, contact_no in rows
+        )
+    return patients
+
+
+def backfill_legacy_masks() -> int:
+    """Convert rows still holding missing_fields JSON to the mask form; returns rows converted.
+
+    A row's dictionary is its complete_data key order, which is the CSV
+    column order it was compared with.
+    """
+    ensure_mask_schema()
+    db = SessionLocal()
+    converted = 0
+    last_id = 0
+    try:
+        while True:
+            rows = db.query(
+                PatientComparison.id, PatientComparison.missing_fields, PatientComparison.complete_data
+            ).filter(
+                PatientComparison.id > last_id,
+                PatientComparison.missing_mask.is_(None),
+                PatientComparison.missing_fields.isnot(None),
+            ).order_by(PatientComparison.id).limit(BACKFILL_CHUNK_SIZE).all()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+
+            updates = []
+            index_rows = []
+            versions: Dict[tuple, int] = {}
+            for comparison_id, missing_fields, complete_data in rows:
+                columns = list(json.loads(complete_data)) if complete_data else []
+                fields = list(json.loads(missing_fields))
+                if len(columns) > MAX_MASK_COLUMNS or not set(fields) <= set(columns):
+                    continue  # Not expressible as a mask; keep the JSON
+                if tuple(columns) not in versions:
+                    versions[tuple(columns)] = get_dictionary_version(db, columns)
+                version = versions[tuple(columns)]
+                mask = encode_mask(fields, {column: k for k, column in enumerate(columns)})
+                updates.append({
+                    'id': comparison_id,
+                    'missing_fields': None,
+                    'missing_mask': mask,
+                    'column_dictionary_version': version,
+                })
+                index_rows.extend(missing_field_rows(comparison_id, version, mask))
+            if updates:
+                db.execute(update(PatientComparison), updates)
+            if index_rows:
+                db.execute(insert(PatientMissingField), index_rows)
+            db.commit()
+            converted += len(updates)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    return converted
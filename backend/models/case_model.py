@@ -11,5 +11,9 @@ class Case(Base):
     follow_up_answers = Column(String)   
     phone = Column(String)
     response_count = Column(Integer, default=0)
-    language: str = "en"
+    language = Column(String, default="en")
+    # Filled in by the background question worker (case_questions.py)
+    questions_status = Column(String)
+    follow_up_questions = Column(String)     # JSON list
+    follow_up_questions_hi = Column(String)  # JSON list
 
@@ -9,10 +9,12 @@ class PatientComparison(Base):
     case_id = Column(String, unique=True, index=True)
     patient_initials = Column(String)
     contact_no = Column(String, index=True)
-    missing_fields = Column(Text)  # JSON
+    missing_fields = Column(Text)  # JSON; legacy rows only, newer rows use missing_mask
     questions = Column(Text)  # JSON
     complete_data = Column(Text)  # JSON
     incomplete_data = Column(Text)  # JSON
+    missing_mask = Column(Integer)  # bit k set = column k of the dictionary version is missing
+    column_dictionary_version = Column(Integer)
     status = Column(String, default="pending")
     completion_percentage = Column(Float, default=0.0)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -44,3 +46,62 @@ class PatientSummary(Base):
     last_updated = Column(DateTime(timezone=True), server_default=func.now())
     risk_assessment = Column(String, default="NOT_ASSESSED")  # HIGH_RISK, LOW_RISK, NOT_ASSESSED
     assessment_date = Column(DateTime(timezone=True), nullable=True)
+
+class QuestionTemplate(Base):
+    __tablename__ = "question_templates"
+
+    id = Column(Integer, primary_key=True, index=True)
+    cache_key = Column(String, unique=True, index=True)
+    field_set = Column(Text)  # JSON, sorted field names
+    language = Column(String)
+    prompt_version = Column(String)
+    templates = Column(Text)  # JSON, field -> question with placeholders
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class ComparisonFingerprint(Base):
+    __tablename__ = "comparison_fingerprints"
+
+    id = Column(Integer, primary_key=True, index=True)
+    case_id = Column(String, unique=True, index=True)
+    fingerprint = Column(String)  # content hash of the missing + matched main row
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class ComparisonCheckpoint(Base):
+    __tablename__ = "comparison_checkpoints"
+
+    id = Column(Integer, primary_key=True, index=True)
+    run_key = Column(String, unique=True, index=True)  # hash of input files and run settings
+    rows_committed = Column(Integer, default=0)  # missing-file rows stored so far, in file order
+    batches_committed = Column(Integer, default=0)
+    status = Column(String, default="running")  # running, completed
+    started_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class ComparisonColumnDictionary(Base):
+    __tablename__ = "comparison_column_dictionaries"
+
+    version = Column(Integer, primary_key=True, index=True)
+    columns = Column(Text, unique=True)  # JSON list of CSV column names; bit k is columns[k]
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class PatientMissingField(Base):
+    """One row per missing field per patient, clustered by field for "all patients missing X" lookups"""
+    __tablename__ = "patient_missing_fields"
+    __table_args__ = {"sqlite_with_rowid": False}
+
+    column_dictionary_version = Column(Integer, primary_key=True)
+    bit = Column(Integer, primary_key=True)
+    comparison_id = Column(Integer, primary_key=True)  # patient_comparisons.id
+
+class Translation(Base):
+    """Machine translations of question text, shared by every translation call site"""
+    __tablename__ = "translations"
+    __table_args__ = {"sqlite_with_rowid": False}
+
+    source_hash = Column(String, primary_key=True)  # sha256 of source_text
+    source_lang = Column(String, primary_key=True)
+    target_lang = Column(String, primary_key=True)
+    engine = Column(String, primary_key=True)  # e.g. "google"
+    source_text = Column(Text)
+    translated_text = Column(Text)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
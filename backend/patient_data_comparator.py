@@ -1,23 +1,142 @@
+import numpy as np
 import pandas as pd
 import sqlite3
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 import json
 import sys
 import os
+import hashlib
+import multiprocessing
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from pathlib import Path
 from dotenv import load_dotenv
+from sqlalchemy import insert, update
 
 # Add the parent directory to the path to import the database module
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from database import SessionLocal
-from models.patient_comparison_model import PatientComparison, PatientResponse
+from config import env_int
+from database import SQL_IN_BATCH_SIZE, SessionLocal, engine
+from models.patient_comparison_model import (
+    ComparisonCheckpoint,
+    ComparisonFingerprint,
+    PatientComparison,
+    PatientMissingField,
+    PatientResponse,
+)
 from ai_engine.azure_question_generator import (
+    BATCH_BASE_TOKENS,
+    BATCH_MAX_TOKENS,
+    BATCH_TOKENS_PER_FIELD,
+    BATCH_TOKENS_PER_PATIENT,
+    MISSING_FIELD_PROMPT_VERSION,
     generate_azure_missing_field_questions,
     generate_azure_missing_field_questions_bilingual,
+    generate_azure_missing_field_questions_bilingual_batch,
+)
+from csv_cache import read_csv_cached
+from missing_field_mask import (
+    MAX_MASK_COLUMNS,
+    delete_missing_field_rows,
+    encode_mask,
+    ensure_mask_schema,
+    get_dictionary_version,
+    missing_field_rows,
+)
+from record_linkage import BLOCKING_KEYS, MAX_BLOCK_SIZE, RecordLinker, linkage_keys
+from question_translations import translate_questions
+from question_template_cache import (
+    CONTACT_PLACEHOLDER,
+    INITIALS_PLACEHOLDER,
+    FieldSet,
+    QuestionTemplateCache,
+    fill_template,
+    is_valid_template,
+    normalize_field_set,
 )
 
 load_dotenv(dotenv_path=Path(__file__).resolve().parent.parent / ".env")
 
+# Patients written per transaction by store_comparison_results
+STORE_CHUNK_SIZE = 5000
+# Missing-file rows per chunk in streaming mode (COMPARISON_CHUNK_SIZE overrides)
+DEFAULT_STREAM_CHUNK_SIZE = 10000
+# Missing-file rows compared and stored per checkpoint in memory mode (COMPARISON_BATCH_SIZE overrides)
+DEFAULT_BATCH_SIZE = 1000
+# Smallest shard worth sending to a worker process when COMPARISON_WORKERS > 1
+MIN_SHARD_ROWS = 500
+# Field sets asked for in one Azure request (AZURE_BATCH_SIZE overrides; 1 = one request each)
+DEFAULT_AZURE_BATCH_SIZE = 5
+
+
+def _env_flag(name: str) -> bool:
+    return (os.getenv(name) or "").strip() in {"1", "true", "TRUE", "yes", "YES"}
+
+
+# Fingerprints of rows without a Case ID are stored under this prefix plus the fingerprint
+KEYLESS_KEY_PREFIX = "keyless:"
+# Appended to the stored fingerprint of a row that got template questions because Azure
+# failed, so the next run sees it as changed and asks Azure again
+PARTIAL_FINGERPRINT_SUFFIX = ":partial"
+
+
+def _fingerprint_key(case_id, fingerprint: Optional[str]):
+    """Key a row's fingerprint is stored under: its Case ID, or for a row without one
+    a surrogate made from the fingerprint itself, which hashes the whole row
+    (Contact no included). None for untracked rows.
+    """
+    if fingerprint is None:
+        return None
+    return f"{KEYLESS_KEY_PREFIX}{fingerprint}" if pd.isna(case_id) else case_id
+
+
+class _RateLimiter:
+    """Spaces out call starts so at most `per_minute` begin in any minute (0 = unlimited)"""
+
+    def __init__(self, per_minute: int):
+        self.interval = 60.0 / per_minute if per_minute > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_start = 0.0
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start)
+            self._next_start = start + self.interval
+        time.sleep(start - now)
+
+
+class ComparisonCancelled(Exception):
+    """Raised at a progress point once cancel_event has been set"""
+
+
+# Comparator holding the frames and indexes inside a shard worker process
+_shard_comparator = None
+
+
+def _init_shard_worker(main_df: pd.DataFrame, missing_df: pd.DataFrame, case_id_index: Dict, contact_index: Dict):
+    global _shard_comparator
+    _shard_comparator = PatientDataComparator("", "", "")
+    _shard_comparator.main_df = main_df
+    _shard_comparator.missing_df = missing_df
+    _shard_comparator._case_id_index = case_id_index
+    _shard_comparator._contact_index = contact_index
+
+
+def _match_shard(positions: np.ndarray, disable_azure: bool) -> Tuple[List, List]:
+    rows_df = _shard_comparator.missing_df.iloc[positions]
+    return _shard_comparator._match_rows(rows_df, disable_azure)
+
+
+def _build_shard(positions: np.ndarray, main_positions: List, fingerprints: List) -> List[Dict]:
+    rows_df = _shard_comparator.missing_df.iloc[positions]
+    return _shard_comparator._build_results(rows_df, main_positions, fingerprints, report_progress=False)
+
+
 class PatientDataComparator:
     def __init__(self, main_csv_path: str, missing_csv_path: str, db_path: str):
         self.main_csv_path = main_csv_path
@@ -25,117 +144,632 @@ class PatientDataComparator:
         self.db_path = db_path
         self.main_df = None
         self.missing_df = None
+        self._case_id_index = {}
+        self._contact_index = {}
+        self._linker = None
+        self._removed_case_ids = []
+        self._mask_schema_ready = False
+        self.last_run_stats = {}
+        self._shard_pool = None
+        self._shard_workers = 1
+        self._shard_base_index = None
+        # Read by background jobs; updated at the "Processing patient" points
+        self.progress = {
+            'stage': 'idle', 'stage_started_at': None, 'processed': 0, 'total': 0,
+            'questions_generated': 0, 'templates_generated': 0, 'templates_total': 0,
+        }
+        self.cancel_event = threading.Event()
         
     def load_data(self):
-        """Load both CSV files"""
-        self.main_df = pd.read_csv(self.main_csv_path)
-        self.missing_df = pd.read_csv(self.missing_csv_path)
+        """Load both CSV files, through the typed cache next to each unless DISABLE_CSV_CACHE is set"""
+        read = pd.read_csv if _env_flag("DISABLE_CSV_CACHE") else read_csv_cached
+        self.main_df = read(self.main_csv_path)
+        self.missing_df = read(self.missing_csv_path)
         print(f"Loaded {len(self.main_df)} records from main file")
         print(f"Loaded {len(self.missing_df)} records from missing file")
+
+    def _report_progress(self, stage: str, processed: Optional[int] = None, total: Optional[int] = None):
+        """Record progress for observers and stop the run if it was cancelled"""
+        if self.cancel_event.is_set():
+            raise ComparisonCancelled("Comparison was cancelled")
+        if self.progress['stage'] != stage:
+            self.progress['stage'] = stage
+            self.progress['stage_started_at'] = time.time()
+        if processed is not None:
+            self.progress['processed'] = processed
+        if total is not None:
+            self.progress['total'] = total
+
+    def _reset_progress(self):
+        self.progress.update(
+            stage='loading', stage_started_at=time.time(), processed=0, total=0,
+            questions_generated=0, templates_generated=0, templates_total=0,
+        )
+
+    def _build_main_index(self):
+        """Build hash indexes on Case ID and Contact no over main_df.
+
+        Each index maps a key to the position of the first main row carrying it,
+        so a lookup is O(1) instead of a full scan of main_df per patient.
+        """
+        self._case_id_index = {}
+        self._contact_index = {}
+        self._linker = None
+        for pos, (case_id, contact_no) in enumerate(
+            zip(self.main_df['Case ID'].tolist(), self.main_df['Contact no'].tolist())
+        ):
+            if not pd.isna(case_id):
+                self._case_id_index.setdefault(case_id, pos)
+            if not pd.isna(contact_no):
+                self._contact_index.setdefault(contact_no, pos)
+
+    def _find_main_position(self, case_id, contact_no):
+        """Return the main_df position for a patient: Case ID first, then Contact no"""
+        if not pd.isna(case_id):
+            pos = self._case_id_index.get(case_id)
+            if pos is not None:
+                return pos
+        if not pd.isna(contact_no):
+            return self._contact_index.get(contact_no)
+        return None
+
+    def _link_unmatched(self, rows_df: pd.DataFrame, main_positions: List):
+        """Fill in main positions for rows without an exact match by fuzzy record linkage.
+
+        The linker's blocking index over main_df is built on first use, so runs
+        where every row matches exactly do not pay for it.
+        """
+        unmatched = [k for k, pos in enumerate(main_positions) if pos is None]
+        if not unmatched or _env_flag("DISABLE_FUZZY_LINKAGE"):
+            return
+        if self._linker is None:
+            self._linker = RecordLinker(self.main_df)
+        linked = 0
+        for k, pos in zip(unmatched, self._linker.link(rows_df.iloc[unmatched])):
+            if pos is not None:
+                main_positions[k] = pos
+                linked += 1
+        if linked:
+            print(f"Linked {linked} of {len(unmatched)} unmatched patients by fuzzy matching")
         
-    def compare_data(self) -> List[Dict]:
-        """Compare main data with missing data and identify missing fields"""
-        comparison_results = []
+    @staticmethod
+    def _missing_value_mask(df: pd.DataFrame) -> pd.DataFrame:
+        """Boolean frame marking missing cells (NaN, empty or whitespace-only)"""
+        mask = df.isna()
+        for column in df.columns:
+            if not pd.api.types.is_numeric_dtype(df[column]):
+                mask[column] |= df[column].astype(str).str.strip().eq('')
+        return mask
+        
+    def _row_fingerprints(self, rows_df: pd.DataFrame, main_positions: List, disable_azure: bool) -> List:
+        """Content hash per missing row, covering the row, its matched main row and
+        how questions are generated; None for rows that cannot be tracked (a Case
+        ID repeated in the file, or no main match). Rows without a Case ID are
+        tracked under a surrogate key, see _fingerprint_key.
+        """
+        salt = f"{MISSING_FIELD_PROMPT_VERSION}/{'template' if disable_azure else 'azure'}"
+        missing_hashes = pd.util.hash_pandas_object(rows_df, index=False).to_numpy()
+        # Row hashes do not depend on the other rows, so only hash the matched main rows
+        matched_positions = [pos for pos in main_positions if pos is not None]
+        main_hashes = iter(pd.util.hash_pandas_object(self.main_df.iloc[matched_positions], index=False).to_numpy())
+        untracked = (rows_df['Case ID'].notna() & rows_df['Case ID'].duplicated(keep=False)).to_numpy()
+
+        fingerprints = []
+        for missing_hash, main_pos, skip in zip(missing_hashes, main_positions, untracked):
+            if main_pos is None:
+                fingerprints.append(None)
+                continue
+            main_hash = next(main_hashes)
+            if skip:
+                fingerprints.append(None)
+            else:
+                fingerprints.append(f"{salt}:{missing_hash:016x}{main_hash:016x}")
+        return fingerprints
+
+    def _select_changed_rows(self, rows_df: pd.DataFrame, fingerprints: List, detect_removed: bool) -> List[int]:
+        """Positions of rows that are new or changed since the last stored run.
+
+        Untracked rows (fingerprint None) are always selected. A row without a
+        Case ID is keyed by its own fingerprint, so it is either unchanged or
+        added. Also records keys fingerprinted last time but absent now (only
+        when the whole file is being processed) and fills in self.last_run_stats.
+        """
+        keys = [
+            _fingerprint_key(case_id, fingerprint)
+            for case_id, fingerprint in zip(rows_df['Case ID'].tolist(), fingerprints)
+        ]
+        previous = self._load_fingerprints(None if detect_removed else [key for key in keys if key is not None])
 
-        max_patients_env = os.getenv("MAX_PATIENTS")
-        max_patients = int(max_patients_env) if max_patients_env and max_patients_env.isdigit() else None
-        disable_azure = (os.getenv("DISABLE_AZURE") or "").strip() in {"1", "true", "TRUE", "yes", "YES"}
-        azure_timeout_env = os.getenv("AZURE_TIMEOUT_SECONDS")
-        azure_timeout_seconds = (
-            int(azure_timeout_env)
-            if azure_timeout_env and azure_timeout_env.isdigit()
-            else 30
+        selected = []
+        stats = {'added': 0, 'changed': 0, 'removed': 0, 'unchanged': 0, 'untracked': 0}
+        for k, (key, fingerprint) in enumerate(zip(keys, fingerprints)):
+            if fingerprint is None:
+                selected.append(k)
+                stats['untracked'] += 1
+            elif key not in previous:
+                selected.append(k)
+                stats['added'] += 1
+            elif previous[key] != fingerprint:
+                selected.append(k)
+                stats['changed'] += 1
+            else:
+                stats['unchanged'] += 1
+
+        if detect_removed:
+            self._removed_case_ids = self._find_removed_case_ids(keys, previous, include_keyless=True)
+            stats['removed'] = len(self._removed_case_ids)
+
+        self.last_run_stats = stats
+        print(
+            f"Incremental run: {stats['added']} added, {stats['changed']} changed, "
+            f"{stats['removed']} removed, {stats['unchanged']} unchanged, "
+            f"{stats['untracked']} without a trackable Case ID"
         )
+        return selected
+
+    def _find_removed_case_ids(self, case_ids: List, previous: Optional[Dict] = None,
+                               include_keyless: bool = False) -> List:
+        """Case IDs fingerprinted by an earlier run that are no longer in case_ids.
+
+        Surrogate keys of rows without a Case ID are only considered when
+        include_keyless is set, i.e. case_ids holds the keys of the whole file.
+        """
+        if previous is None:
+            previous = self._load_fingerprints()
+        present = set(case_ids)
+        return [
+            case_id for case_id in previous
+            if case_id not in present and (include_keyless or not str(case_id).startswith(KEYLESS_KEY_PREFIX))
+        ]
+
+    @staticmethod
+    def _add_run_stats(run_stats: Dict, stats: Dict):
+        for key, value in stats.items():
+            run_stats[key] = run_stats.get(key, 0) + value
+
+    def _checkpoint_key(self, max_patients: Optional[int]) -> str:
+        """Identify a run by its input files and the settings that change which rows it writes"""
+        parts = []
+        for path in (self.main_csv_path, self.missing_csv_path):
+            stat = os.stat(path)
+            parts.append([os.path.abspath(path), stat.st_size, stat.st_mtime_ns])
+        parts.append([_env_flag("FULL_COMPARISON"), _env_flag("DISABLE_AZURE"), max_patients])
+        return hashlib.sha256(json.dumps(parts).encode("utf-8")).hexdigest()
+
+    def _load_checkpoint(self, run_key: str) -> int:
+        """Rows already committed by an unfinished run with the same key (0 starts afresh)"""
+        ComparisonCheckpoint.__table__.create(bind=engine, checkfirst=True)
+        db = SessionLocal()
+        try:
+            checkpoint = db.query(ComparisonCheckpoint).filter(ComparisonCheckpoint.run_key == run_key).first()
+            if checkpoint is None:
+                db.add(ComparisonCheckpoint(run_key=run_key, rows_committed=0, batches_committed=0, status="running"))
+                db.commit()
+                return 0
+            if checkpoint.status != "running":
+                checkpoint.rows_committed = 0
+                checkpoint.batches_committed = 0
+                checkpoint.status = "running"
+                db.commit()
+                return 0
+            return checkpoint.rows_committed or 0
+        finally:
+            db.close()
+
+    def _complete_checkpoint(self, run_key: str):
+        db = SessionLocal()
+        try:
+            db.query(ComparisonCheckpoint).filter(ComparisonCheckpoint.run_key == run_key).update(
+                {'status': "completed"}
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    def _load_fingerprints(self, case_ids: Optional[List] = None) -> Dict:
+        """Stored fingerprints by Case ID, for all rows or only the given Case IDs"""
+        ComparisonFingerprint.__table__.create(bind=engine, checkfirst=True)
+        db = SessionLocal()
+        try:
+            query = db.query(ComparisonFingerprint.case_id, ComparisonFingerprint.fingerprint)
+            if case_ids is None:
+                return dict(query)
+            keys = [case_id for case_id in dict.fromkeys(case_ids) if not pd.isna(case_id)]
+            found = {}
+            for start in range(0, len(keys), SQL_IN_BATCH_SIZE):
+                found.update(query.filter(ComparisonFingerprint.case_id.in_(keys[start:start + SQL_IN_BATCH_SIZE])))
+            return found
+        finally:
+            db.close()
+        
+    def _match_rows(self, rows_df: pd.DataFrame, disable_azure: bool) -> Tuple[List, List]:
+        """main_df position (None when unmatched) and fingerprint for each row"""
+        main_positions = [
+            self._find_main_position(case_id, contact_no)
+            for case_id, contact_no in zip(rows_df['Case ID'].tolist(), rows_df['Contact no'].tolist())
+        ]
+        self._link_unmatched(rows_df, main_positions)
+        return main_positions, self._row_fingerprints(rows_df, main_positions, disable_azure)
+
+    def _build_results(self, rows_df: pd.DataFrame, main_positions: List, fingerprints: List,
+                       progress_offset: int = 0, total: Optional[int] = None,
+                       report_progress: bool = True) -> List[Dict]:
+        """Comparison results, without questions, for the matched rows of rows_df"""
+        comparison_results = []
+        columns = list(rows_df.columns)
+        missing_mask = self._missing_value_mask(rows_df).to_numpy()
+        total = len(rows_df) if total is None else total
+
+        matched_positions = [pos for pos in main_positions if pos is not None]
+        main_records = iter(self.main_df.iloc[matched_positions].to_dict('records'))
         
-        for i, (_, missing_row) in enumerate(self.missing_df.iterrows(), start=1):
-            if max_patients is not None and i > max_patients:
-                break
-
-            if i == 1 or i % 10 == 0:
-                total = len(self.missing_df)
-                if max_patients is not None:
-                    total = min(total, max_patients)
+        for i, (missing_row, row_mask, main_pos, fingerprint) in enumerate(
+            zip(rows_df.to_dict('records'), missing_mask, main_positions, fingerprints), start=progress_offset + 1
+        ):
+            if report_progress and (i == 1 or i % 10 == 0):
                 print(f"Processing patient {i}/{total}...")
+                self._report_progress('comparing', i, total)
 
             case_id = missing_row['Case ID']
             contact_no = missing_row['Contact no']
             
-            # Find matching patient in main data
-            main_match = self.main_df[
-                (self.main_df['Case ID'] == case_id) | 
-                (self.main_df['Contact no'] == contact_no)
-            ]
-            
-            if main_match.empty:
+            if main_pos is None:
                 print(f"Warning: No match found for Case ID: {case_id}, Contact: {contact_no}")
                 continue
                 
-            main_row = main_match.iloc[0]
+            main_row = next(main_records)
             
             # Identify missing fields
             missing_fields = {}
-            questions = []
             
-            for column in self.missing_df.columns:
-                missing_value = missing_row[column]
-                main_value = main_row[column]
-                
-                # Check if data is missing (empty, NaN, or placeholder)
-                if pd.isna(missing_value) or missing_value == '' or str(missing_value).strip() == '':
-                    missing_fields[column] = {
-                        'missing_value': missing_value,
-                        'correct_value': main_value,
-                        'field_name': column
-                    }
+            for j in row_mask.nonzero()[0]:
+                column = columns[j]
+                missing_fields[column] = {
+                    'missing_value': missing_row[column],
+                    'correct_value': main_row[column],
+                    'field_name': column
+                }
+
+            comparison_results.append({
+                'case_id': case_id,
+                'patient_initials': missing_row['Patient Initials'],
+                'contact_no': contact_no,
+                'missing_fields': missing_fields,
+                'questions': [],
+                'complete_data': main_row,
+                'incomplete_data': missing_row,
+                'row_fingerprint': fingerprint
+            })
+        return comparison_results
 
-            missing_field_names = list(missing_fields.keys())
+    def _start_shard_pool(self, rows_df: pd.DataFrame, workers: int):
+        """Start worker processes holding main_df, rows_df and the main indexes.
 
-            try:
-                if disable_azure:
-                    azure_questions = {}
-                    azure_questions_hi = {}
-                else:
-                    print(f"Generating bilingual questions via Azure for Case ID {case_id} ({len(missing_field_names)} fields)...")
-                    bilingual = generate_azure_missing_field_questions_bilingual(
-                        patient_initials=main_row['Patient Initials'],
-                        contact_no=str(contact_no),
-                        missing_fields=missing_field_names,
-                        timeout_seconds=azure_timeout_seconds,
-                    )
-                    azure_questions = bilingual.get("en") or {}
-                    azure_questions_hi = bilingual.get("hi") or {}
-            except Exception:
-                azure_questions = {}
-                azure_questions_hi = {}
+        Workers are forked where the platform allows it and this process has
+        no other threads, so the frames and indexes are shared copy-on-write
+        instead of being copied per worker. Forking while other threads run
+        (e.g. on a comparison job thread inside uvicorn) could leave a worker
+        holding a lock, such as stdout's, that no thread will ever release;
+        then, as on platforms without fork, workers come from forkserver or
+        spawn and the frames are pickled to each worker once, at start-up.
+        """
+        start_methods = multiprocessing.get_all_start_methods()
+        if "fork" in start_methods and threading.active_count() == 1:
+            method = "fork"
+        else:
+            method = "forkserver" if "forkserver" in start_methods else "spawn"
+        context = multiprocessing.get_context(method)
+        self._shard_workers = workers
+        self._shard_pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=context,
+            initializer=_init_shard_worker,
+            initargs=(self.main_df, rows_df, self._case_id_index, self._contact_index),
+        )
+        self._shard_base_index = rows_df.index
+        print(f"Sharding comparison over {workers} worker processes ({method})")
+
+    def _stop_shard_pool(self):
+        if self._shard_pool is not None:
+            self._shard_pool.shutdown(cancel_futures=True)
+        self._shard_pool = None
+        self._shard_workers = 1
+
+    def _shard_rows(self, rows_df: pd.DataFrame) -> List[np.ndarray]:
+        """Split rows_df positions into shards by a hash of Case ID.
+
+        Every row of a Case ID lands in the same shard, so per-shard duplicate
+        detection matches the unsharded run. Returns [] when there is no shard
+        pool or too few rows to be worth sending to workers.
+        """
+        shard_count = min(self._shard_workers, len(rows_df) // MIN_SHARD_ROWS)
+        if self._shard_pool is None or shard_count < 2:
+            return []
+        shard_of = pd.util.hash_pandas_object(rows_df['Case ID'], index=False).to_numpy() % shard_count
+        return [shard for shard in (np.flatnonzero(shard_of == k) for k in range(shard_count)) if len(shard)]
+
+    def _match_rows_sharded(self, rows_df: pd.DataFrame, shards: List[np.ndarray],
+                            disable_azure: bool) -> Tuple[List, List]:
+        """_match_rows over worker processes, merged back into row order"""
+        base_positions = self._shard_base_index.get_indexer(rows_df.index)
+        futures = [self._shard_pool.submit(_match_shard, base_positions[shard], disable_azure) for shard in shards]
+        main_positions = [None] * len(rows_df)
+        fingerprints = [None] * len(rows_df)
+        for shard, future in zip(shards, futures):
+            shard_positions, shard_fingerprints = future.result()
+            self._report_progress('comparing')
+            for k, pos, fingerprint in zip(shard, shard_positions, shard_fingerprints):
+                main_positions[k] = pos
+                fingerprints[k] = fingerprint
+        return main_positions, fingerprints
+
+    def _build_results_sharded(self, rows_df: pd.DataFrame, shards: List[np.ndarray], main_positions: List,
+                               fingerprints: List, progress_offset: int, total: int) -> List[Dict]:
+        """_build_results over worker processes, merged back into row order"""
+        base_positions = self._shard_base_index.get_indexer(rows_df.index)
+        futures = {
+            self._shard_pool.submit(
+                _build_shard,
+                base_positions[shard],
+                [main_positions[k] for k in shard],
+                [fingerprints[k] for k in shard],
+            ): shard
+            for shard in shards
+        }
+        by_row = {}
+        processed = progress_offset
+        for future in as_completed(futures):
+            shard = futures[future]
+            matched = [k for k in shard if main_positions[k] is not None]
+            by_row.update(zip(matched, future.result()))
+            processed += len(shard)
+            print(f"Processing patient {processed}/{total}...")
+            self._report_progress('comparing', processed, total)
+        return [by_row[k] for k in sorted(by_row)]
+
+    def compare_data(self) -> List[Dict]:
+        """Compare main data with missing data and identify missing fields"""
+        max_patients = env_int("MAX_PATIENTS")
+
+        self._build_main_index()
+        self._removed_case_ids = []
 
-            for column in missing_field_names:
+        rows_df = self.missing_df if max_patients is None else self.missing_df.head(max_patients)
+        return self._compare_rows(rows_df, detect_removed=max_patients is None)
+
+    def _compare_rows(self, rows_df: pd.DataFrame, detect_removed: bool,
+                      progress_offset: int = 0, progress_total: Optional[int] = None) -> List[Dict]:
+        """Compare rows_df against the indexed main_df.
+
+        progress_offset/progress_total let chunked callers report progress
+        against the whole file rather than the current chunk. While a shard
+        pool is running (see run_comparison), matching and building results are
+        spread over its worker processes.
+        """
+        disable_azure = _env_flag("DISABLE_AZURE")
+        azure_timeout_seconds = env_int("AZURE_TIMEOUT_SECONDS", 30)
+        full_run = _env_flag("FULL_COMPARISON")
+
+        total = row_count = len(rows_df)
+        shards = self._shard_rows(rows_df)
+        if shards:
+            main_positions, fingerprints = self._match_rows_sharded(rows_df, shards, disable_azure)
+        else:
+            main_positions, fingerprints = self._match_rows(rows_df, disable_azure)
+
+        selected = self._select_changed_rows(rows_df, fingerprints, detect_removed)
+        if full_run:
+            # Rows without a Case ID can only be inserted, so even a full run skips unchanged ones
+            changed = set(selected)
+            selected = [k for k, case_id in enumerate(rows_df['Case ID'].tolist()) if k in changed or not pd.isna(case_id)]
+        if len(selected) < row_count:
+            rows_df = rows_df.iloc[selected]
+            main_positions = [main_positions[k] for k in selected]
+            fingerprints = [fingerprints[k] for k in selected]
+            total = len(rows_df)
+        if progress_total is not None:
+            total = progress_total
+
+        shards = self._shard_rows(rows_df)
+        if shards:
+            comparison_results = self._build_results_sharded(
+                rows_df, shards, main_positions, fingerprints, progress_offset, total
+            )
+        else:
+            comparison_results = self._build_results(rows_df, main_positions, fingerprints, progress_offset, total)
+
+        self._report_progress('comparing', total if progress_total is None else progress_offset + row_count)
+
+        if disable_azure:
+            azure_results = [{} for _ in comparison_results]
+        else:
+            azure_results = self._generate_azure_questions(comparison_results, azure_timeout_seconds)
+
+        self._attach_questions(comparison_results, azure_results, expect_azure=not disable_azure)
+        if not _env_flag("DISABLE_TRANSLATION"):
+            self._translate_questions(comparison_results)
+        return comparison_results
+
+    def _translate_questions(self, comparison_results: List[Dict]):
+        """Store a question_hi with every question, so the patient interface never translates.
+
+        Questions Azure already gave in Hindi are kept; the rest go through the
+        translation cache in batched calls. A translator failure leaves
+        question_hi empty for backfill_question_translations to fill later.
+        """
+        self._report_progress('translating_questions')
+        try:
+            translate_questions([q for result in comparison_results for q in result['questions']])
+        except Exception as e:
+            print("Translation error:", e)
+
+    def _attach_questions(self, comparison_results: List[Dict], azure_results: List[Dict], expect_azure: bool = False):
+        """Fill each result's questions from its Azure questions, falling back to templates.
+
+        With expect_azure, a result that needed a fallback is marked
+        questions_complete=False.
+        """
+        for result, bilingual in zip(comparison_results, azure_results):
+            main_row = result['complete_data']
+            azure_questions = bilingual.get("en") or {}
+            azure_questions_hi = bilingual.get("hi") or {}
+
+            for column in result['missing_fields']:
                 main_value = main_row[column]
                 question = azure_questions.get(column)
                 question_hi = azure_questions_hi.get(column)
                 if not question:
-                    question = f"Please provide the {column} for patient {main_row['Patient Initials']} (PHN: {contact_no})"
+                    question = f"Please provide the {column} for patient {main_row['Patient Initials']} (PHN: {result['contact_no']})"
+                    if expect_azure:
+                        result['questions_complete'] = False
                 if not question_hi:
                     question_hi = ""
 
-                questions.append({
+                result['questions'].append({
                     'field': column,
                     'question': question,
                     'question_hi': question_hi,
                     'expected_answer': main_value
                 })
-            
-            comparison_results.append({
-                'case_id': case_id,
-                'patient_initials': missing_row['Patient Initials'],
-                'contact_no': contact_no,
-                'missing_fields': missing_fields,
-                'questions': questions,
-                'complete_data': main_row.to_dict(),
-                'incomplete_data': missing_row.to_dict()
-            })
-            
-        return comparison_results
+            self.progress['questions_generated'] += len(result['questions'])
     
+    def _generate_azure_questions(self, comparison_results: List[Dict], timeout_seconds: int) -> List[Dict]:
+        """Generate bilingual Azure questions for every patient.
+
+        Questions only depend on the set of missing fields, so Azure is asked
+        once per distinct field set for placeholder templates, which are cached
+        in pv.db and filled in with each patient's initials and PHN. Cache
+        misses are asked for AZURE_BATCH_SIZE field sets per request, with a
+        single-field-set request for any the batched reply leaves out or gets
+        wrong. Requests run concurrently: up to AZURE_MAX_WORKERS at once and
+        at most AZURE_REQUESTS_PER_MINUTE starts per minute (0 = no cap).
+        Results are returned in the order of comparison_results; a field set
+        whose calls fail or time out gets an empty mapping and falls back to
+        template questions.
+        """
+        self._report_progress('generating_questions')
+        max_workers = max(env_int("AZURE_MAX_WORKERS", 4), 1)
+        batch_size = max(env_int("AZURE_BATCH_SIZE", DEFAULT_AZURE_BATCH_SIZE), 1)
+        limiter = _RateLimiter(env_int("AZURE_REQUESTS_PER_MINUTE", 0))
+        cache = QuestionTemplateCache(MISSING_FIELD_PROMPT_VERSION)
+
+        patient_field_sets = [normalize_field_set(r['missing_fields']) for r in comparison_results]
+        field_sets = [fs for fs in dict.fromkeys(patient_field_sets) if fs]
+        cached_en = cache.get_many(field_sets, "en")
+        cached_hi = cache.get_many(field_sets, "hi")
+        misses = [fs for fs in field_sets if fs not in cached_en or fs not in cached_hi]
+        print(f"Question templates: {len(field_sets) - len(misses)} cached, {len(misses)} to generate")
+        self.progress['templates_total'] += len(misses)
+
+        def generate(batch: List[FieldSet]) -> Dict[FieldSet, Dict]:
+            """Templates for a batch of field sets: one batched request, then one request per
+            field set the batched reply did not cover"""
+            results = {}
+            if len(batch) > 1:
+                if self.cancel_event.is_set():
+                    raise ComparisonCancelled("Comparison was cancelled")
+                limiter.wait()
+                print(f"Generating bilingual question templates via Azure ({len(batch)} field sets in one request)...")
+                try:
+                    by_id = generate_azure_missing_field_questions_bilingual_batch(
+                        {
+                            str(k): {
+                                'patient_initials': INITIALS_PLACEHOLDER,
+                                'contact_no': CONTACT_PLACEHOLDER,
+                                'missing_fields': list(field_set),
+                            }
+                            for k, field_set in enumerate(batch)
+                        },
+                        timeout_seconds=timeout_seconds,
+                    )
+                    results = {batch[int(k)]: bilingual for k, bilingual in by_id.items()}
+                except Exception as e:
+                    print(f"Batched Azure question generation failed, retrying field sets one by one: {e}")
+
+            for field_set in batch:
+                if field_set in results:
+                    continue
+                if self.cancel_event.is_set():
+                    raise ComparisonCancelled("Comparison was cancelled")
+                limiter.wait()
+                print(f"Generating bilingual question templates via Azure ({len(field_set)} fields)...")
+                try:
+                    results[field_set] = generate_azure_missing_field_questions_bilingual(
+                        patient_initials=INITIALS_PLACEHOLDER,
+                        contact_no=CONTACT_PLACEHOLDER,
+                        missing_fields=list(field_set),
+                        timeout_seconds=timeout_seconds,
+                    )
+                except Exception as e:
+                    print(f"Azure question generation failed for fields {list(field_set)}: {e}")
+            return results
+
+        generated_en: Dict[FieldSet, Dict[str, str]] = {}
+        generated_hi: Dict[FieldSet, Dict[str, str]] = {}
+        batches = self._batch_field_sets(misses, batch_size)
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = [pool.submit(generate, batch) for batch in batches]
+            for batch, future in zip(batches, futures):
+                try:
+                    batch_results = future.result()
+                except Exception as e:
+                    print(f"Azure question generation failed for {len(batch)} field sets: {e}")
+                    continue
+                finally:
+                    self.progress['templates_generated'] += len(batch)
+                for field_set, bilingual in batch_results.items():
+                    # Mangled templates are dropped, so those fields fall back to template questions
+                    en = {f: t for f, t in (bilingual.get("en") or {}).items() if is_valid_template(t)}
+                    hi = {f: t for f, t in (bilingual.get("hi") or {}).items() if is_valid_template(t)}
+                    if en:
+                        generated_en[field_set] = en
+                        generated_hi[field_set] = hi
+
+        # Only field sets with a valid English template for every field are cached;
+        # the rest are asked again next run
+        complete = [fs for fs, en in generated_en.items() if all(field in en for field in fs)]
+        if len(complete) < len(generated_en):
+            print(f"Question templates: {len(generated_en) - len(complete)} with missing or invalid placeholders not cached")
+        try:
+            cache.put_many({fs: generated_en[fs] for fs in complete}, "en")
+            cache.put_many({fs: generated_hi[fs] for fs in complete}, "hi")
+        except Exception as e:
+            print(f"Could not store question templates: {e}")
+        cached_en.update(generated_en)
+        cached_hi.update(generated_hi)
+        self._report_progress('generating_questions')
+
+        azure_results = []
+        for result, field_set in zip(comparison_results, patient_field_sets):
+            initials = result['complete_data']['Patient Initials']
+            contact_no = result['contact_no']
+            azure_results.append({
+                lang: {
+                    field: fill_template(template, initials, contact_no)
+                    for field, template in templates.get(field_set, {}).items()
+                }
+                for lang, templates in (("en", cached_en), ("hi", cached_hi))
+            })
+        return azure_results
+
+    @staticmethod
+    def _batch_field_sets(field_sets: List[FieldSet], batch_size: int) -> List[List[FieldSet]]:
+        """Group field sets into batched requests of at most batch_size, keeping each
+        request's expected reply within BATCH_MAX_TOKENS"""
+        batches = []
+        batch: List[FieldSet] = []
+        tokens = BATCH_BASE_TOKENS
+        for field_set in field_sets:
+            cost = BATCH_TOKENS_PER_PATIENT + BATCH_TOKENS_PER_FIELD * len(field_set)
+            if batch and (len(batch) >= batch_size or tokens + cost > BATCH_MAX_TOKENS):
+                batches.append(batch)
+                batch, tokens = [], BATCH_BASE_TOKENS
+            batch.append(field_set)
+            tokens += cost
+        if batch:
+            batches.append(batch)
+        return batches
+
     def _generate_question(self, field_name: str, patient_initials: str, contact_no: str) -> str:
         """Generate specific questions for missing data fields"""
         patient_identifier = f"patient {patient_initials} (PHN: {contact_no})"
@@ -160,63 +794,177 @@ class PatientDataComparator:
         
         return questions.get(field_name, f"Please provide the {field_name} for {patient_identifier}")
     
-    def store_comparison_results(self, comparison_results: List[Dict]):
-        """Store comparison results in database using SQLAlchemy"""
+    def store_comparison_results(self, comparison_results: List[Dict], scoped: bool = False,
+                                 checkpoint: Optional[Tuple[str, int]] = None):
+        """Store comparison results in database using SQLAlchemy.
+
+        With scoped=True only existing rows for the Case IDs in
+        comparison_results are loaded; checkpoint=(run_key, rows) records that
+        the run has stored its first `rows` missing-file rows.
+        """
+        if not self._mask_schema_ready:
+            # Once per comparator: the ALTER check inspects the table every time
+            ensure_mask_schema()
+            self._mask_schema_ready = True
         db = SessionLocal()
         
         try:
+            if not comparison_results:
+                # Nothing to write, and no column dictionary to create for an empty column list
+                self._store_run_state(db, checkpoint)
+                return
+
+            # Missing fields are stored as a bitmask over a versioned dictionary of the
+            # missing file's columns, plus any missing field outside them
+            columns = dict.fromkeys(comparison_results[0]['incomplete_data'])
             for result in comparison_results:
-                # Check if patient comparison already exists
-                existing = db.query(PatientComparison).filter(
-                    PatientComparison.case_id == result['case_id']
-                ).first()
-                
-                if existing:
-                    # Update existing record
-                    existing.missing_fields = json.dumps(result['missing_fields'])
-                    existing.questions = json.dumps(result['questions'])
-                    existing.complete_data = json.dumps(result['complete_data'])
-                    existing.incomplete_data = json.dumps(result['incomplete_data'])
-                    existing.status = "pending"
-                    existing.completion_percentage = 0.0
-                else:
-                    # Create new patient comparison record
-                    patient_comparison = PatientComparison(
-                        case_id=result['case_id'],
-                        patient_initials=result['patient_initials'],
-                        contact_no=result['contact_no'],
-                        missing_fields=json.dumps(result['missing_fields']),
-                        questions=json.dumps(result['questions']),
-                        complete_data=json.dumps(result['complete_data']),
-                        incomplete_data=json.dumps(result['incomplete_data']),
-                        status="pending",
-                        completion_percentage=0.0
-                    )
-                    db.add(patient_comparison)
-                
-                # Commit the patient comparison first to get the ID
-                db.commit()
-                
-                # Create individual question records
-                for question_data in result['questions']:
-                    # Check if response already exists
-                    existing_response = db.query(PatientResponse).filter(
-                        PatientResponse.case_id == result['case_id'],
-                        PatientResponse.field_name == question_data['field']
-                    ).first()
-                    
-                    if not existing_response:
-                        patient_response = PatientResponse(
-                            case_id=result['case_id'],
-                            field_name=question_data['field'],
-                            question=question_data['question'],
-                            expected_answer=str(question_data['expected_answer']),
-                            is_correct=False
-                        )
-                        db.add(patient_response)
-                
+                columns.update(dict.fromkeys(result['missing_fields']))
+            columns = list(columns)
+            dictionary_version = None
+            if len(columns) <= MAX_MASK_COLUMNS:
+                dictionary_version = get_dictionary_version(db, columns)
+                bits = {column: k for k, column in enumerate(columns)}
+
+            # Existing comparisons and response pairs, one query each; scoped, only this batch's
+            # Case IDs, so per-batch writes don't grow with the table
+            id_query = db.query(
+                PatientComparison.id, PatientComparison.case_id,
+                PatientComparison.column_dictionary_version, PatientComparison.missing_mask,
+            )
+            pair_query = db.query(PatientResponse.case_id, PatientResponse.field_name)
+            if scoped:
+                keys = [r['case_id'] for r in comparison_results if not pd.isna(r['case_id'])]
+                keys = list(dict.fromkeys(keys))
+                existing_rows = []
+                existing_pairs = set()
+                for start in range(0, len(keys), SQL_IN_BATCH_SIZE):
+                    batch = keys[start:start + SQL_IN_BATCH_SIZE]
+                    existing_rows.extend(id_query.filter(PatientComparison.case_id.in_(batch)))
+                    existing_pairs.update(pair_query.filter(PatientResponse.case_id.in_(batch)))
+            else:
+                existing_rows = id_query.all()
+                existing_pairs = set(pair_query)
+            existing_ids = {case_id: comparison_id for comparison_id, case_id, _, _ in existing_rows}
+            # Masks currently stored per comparison id, to remove their index rows on update
+            stored_masks = {comparison_id: (version, mask) for comparison_id, _, version, mask in existing_rows}
+
+            # Bulk inserts/updates, one commit per chunk together with its row fingerprints
+            for start in range(0, len(comparison_results), STORE_CHUNK_SIZE):
+                self._report_progress('storing')
+                new_comparisons = {}
+                updated_comparisons = {}
+                keyless_comparisons = []
+                new_responses = []
+                chunk_fingerprints = {}
+
+                for result in comparison_results[start:start + STORE_CHUNK_SIZE]:
+                    case_id = result['case_id']
+                    fingerprint = result.get('row_fingerprint')
+                    if fingerprint:
+                        key = _fingerprint_key(case_id, fingerprint)
+                        # Rows without a Case ID can't be updated, so retrying them would add a duplicate
+                        if not result.get('questions_complete', True) and not pd.isna(case_id):
+                            fingerprint += PARTIAL_FINGERPRINT_SUFFIX
+                        chunk_fingerprints[key] = fingerprint
+                    if dictionary_version is not None:
+                        mask_values = {
+                            'missing_fields': None,
+                            'missing_mask': encode_mask(result['missing_fields'], bits),
+                            'column_dictionary_version': dictionary_version,
+                        }
+                    else:
+                        # Too many columns for a 64-bit mask: keep the JSON form
+                        mask_values = {
+                            'missing_fields': json.dumps(result['missing_fields']),
+                            'missing_mask': None,
+                            'column_dictionary_version': None,
+                        }
+                    values = {
+                        **mask_values,
+                        'questions': json.dumps(result['questions']),
+                        'complete_data': json.dumps(result['complete_data']),
+                        'incomplete_data': json.dumps(result['incomplete_data']),
+                        'status': "pending",
+                        'completion_percentage': 0.0,
+                    }
+
+                    if pd.isna(case_id):
+                        # No key to match on: always a new row. Unchanged keyless rows never get
+                        # here, their surrogate fingerprint key (see _fingerprint_key) is already stored
+                        keyless_comparisons.append({
+                            'case_id': case_id,
+                            'patient_initials': result['patient_initials'],
+                            'contact_no': result['contact_no'],
+                            **values,
+                        })
+                    elif case_id in existing_ids:
+                        updated_comparisons[case_id] = {'id': existing_ids[case_id], **values}
+                    elif case_id in new_comparisons:
+                        # Same Case ID twice in one chunk: later row wins, as an update would
+                        new_comparisons[case_id].update(values)
+                    else:
+                        new_comparisons[case_id] = {
+                            'case_id': case_id,
+                            'patient_initials': result['patient_initials'],
+                            'contact_no': result['contact_no'],
+                            **values,
+                        }
+
+                    # Create individual question records
+                    for question_data in result['questions']:
+                        pair = (case_id, question_data['field'])
+                        if pair in existing_pairs:
+                            continue
+                        if not pd.isna(case_id):
+                            existing_pairs.add(pair)
+                        new_responses.append({
+                            'case_id': case_id,
+                            'field_name': question_data['field'],
+                            'question': question_data['question'],
+                            'expected_answer': str(question_data['expected_answer']),
+                            'is_correct': False,
+                        })
+
+                inserted = list(new_comparisons.values()) + keyless_comparisons
+                inserted_ids = []
+                if inserted:
+                    inserted_ids = db.execute(
+                        insert(PatientComparison).returning(PatientComparison.id, sort_by_parameter_order=True),
+                        inserted,
+                    ).scalars().all()
+                    # Later chunks must update, not re-insert, these Case IDs
+                    existing_ids.update(zip(new_comparisons, inserted_ids))
+                if updated_comparisons:
+                    db.execute(update(PatientComparison), list(updated_comparisons.values()))
+                    delete_missing_field_rows(db, [
+                        key
+                        for row in updated_comparisons.values()
+                        for key in missing_field_rows(row['id'], *stored_masks.get(row['id'], (None, None)))
+                    ])
+
+                written = list(zip(inserted_ids, inserted)) + [(row['id'], row) for row in updated_comparisons.values()]
+                index_rows = []
+                for comparison_id, row in written:
+                    stored_masks[comparison_id] = (row['column_dictionary_version'], row['missing_mask'])
+                    index_rows.extend(missing_field_rows(comparison_id, row['column_dictionary_version'], row['missing_mask']))
+                if index_rows:
+                    db.execute(insert(PatientMissingField), index_rows)
+                if new_responses:
+                    db.execute(insert(PatientResponse), new_responses)
+
+                if chunk_fingerprints:
+                    db.query(ComparisonFingerprint).filter(
+                        ComparisonFingerprint.case_id.in_(list(chunk_fingerprints))
+                    ).delete(synchronize_session=False)
+                    db.execute(insert(ComparisonFingerprint), [
+                        {'case_id': case_id, 'fingerprint': fingerprint}
+                        for case_id, fingerprint in chunk_fingerprints.items()
+                    ])
                 db.commit()
-            
+
+            # After the results: re-storing a batch is harmless, so a crash in between
+            # only means that batch is compared again on resume
+            self._store_run_state(db, checkpoint)
             print(f"Stored {len(comparison_results)} comparison results in database")
             
         except Exception as e:
@@ -225,14 +973,222 @@ class PatientDataComparator:
             raise
         finally:
             db.close()
+
+    def _store_run_state(self, db, checkpoint: Optional[Tuple[str, int]]):
+        """Drop the fingerprints of removed rows and record the checkpoint, after a batch's results"""
+        if self._removed_case_ids:
+            # Forget rows that left the missing file so they count as added if they return
+            for start in range(0, len(self._removed_case_ids), STORE_CHUNK_SIZE):
+                db.query(ComparisonFingerprint).filter(
+                    ComparisonFingerprint.case_id.in_(self._removed_case_ids[start:start + STORE_CHUNK_SIZE])
+                ).delete(synchronize_session=False)
+            db.commit()
+            self._removed_case_ids = []
+
+        if checkpoint:
+            run_key, rows_committed = checkpoint
+            db.query(ComparisonCheckpoint).filter(ComparisonCheckpoint.run_key == run_key).update({
+                'rows_committed': rows_committed,
+                'batches_committed': ComparisonCheckpoint.batches_committed + 1,
+            })
+            db.commit()
     
+    def _stage_main_file(self, staging_db: sqlite3.Connection, chunk_size: int):
+        """Copy the main CSV into an indexed SQLite table, chunk by chunk.
+
+        The fuzzy-linkage blocking keys are staged alongside each row (as
+        _<key> columns) so unmatched patients can find their candidates too.
+        """
+        position = 0
+        for chunk in pd.read_csv(self.main_csv_path, chunksize=chunk_size):
+            keys = linkage_keys(chunk)
+            for key in BLOCKING_KEYS:
+                chunk[f'_{key}'] = keys[key].astype(object).where(keys[key].notna(), None)
+            chunk.insert(0, '_pos', range(position, position + len(chunk)))
+            chunk.to_sql('main_rows', staging_db, if_exists='append', index=False)
+            position += len(chunk)
+        staging_db.execute('CREATE INDEX idx_main_case_id ON main_rows ("Case ID")')
+        staging_db.execute('CREATE INDEX idx_main_contact_no ON main_rows ("Contact no")')
+        for key in BLOCKING_KEYS:
+            staging_db.execute(f'CREATE INDEX idx_main_{key} ON main_rows ("_{key}")')
+        staging_db.commit()
+        print(f"Staged {position} records from main file")
+
+    @staticmethod
+    def _query_main_rows(staging_db: sqlite3.Connection, column: str, values: List,
+                         max_block_size: Optional[int] = None) -> List[pd.DataFrame]:
+        """Staged main rows whose column is one of values, skipping values shared by
+        more than max_block_size rows when it is given"""
+        keys = [key for key in dict.fromkeys(values) if not pd.isna(key)]
+        frames = []
+        for start in range(0, len(keys), SQL_IN_BATCH_SIZE):
+            batch = keys[start:start + SQL_IN_BATCH_SIZE]
+            placeholders = ",".join("?" * len(batch))
+            query = f'SELECT * FROM main_rows WHERE "{column}" IN ({placeholders})'
+            params = list(batch)
+            if max_block_size is not None:
+                query = (
+                    f'SELECT * FROM main_rows WHERE "{column}" IN ('
+                    f'SELECT "{column}" FROM main_rows WHERE "{column}" IN ({placeholders}) '
+                    f'GROUP BY "{column}" HAVING COUNT(*) <= ?)'
+                )
+                params.append(max_block_size)
+            frames.append(pd.read_sql_query(query, staging_db, params=params))
+        return frames
+
+    def _lookup_main_rows(self, staging_db: sqlite3.Connection, rows_df: pd.DataFrame) -> pd.DataFrame:
+        """Main rows sharing a Case ID or Contact no with rows_df, in main-file order.
+
+        Rows of rows_df with neither also pull in the main rows sharing one of
+        their fuzzy-linkage blocking keys.
+        """
+        frames = []
+        for column in ('Case ID', 'Contact no'):
+            frames.extend(self._query_main_rows(staging_db, column, rows_df[column].tolist()))
+
+        if not _env_flag("DISABLE_FUZZY_LINKAGE"):
+            found = pd.concat(frames) if frames else pd.DataFrame(columns=['Case ID', 'Contact no'])
+            unmatched = rows_df[
+                ~rows_df['Case ID'].isin(found['Case ID'].dropna()) & ~rows_df['Contact no'].isin(found['Contact no'].dropna())
+            ]
+            if len(unmatched):
+                keys = linkage_keys(unmatched)
+                for key in BLOCKING_KEYS:
+                    frames.extend(self._query_main_rows(
+                        staging_db, f'_{key}', keys[key].dropna().tolist(), max_block_size=MAX_BLOCK_SIZE
+                    ))
+
+        staged_columns = ['_pos'] + [f'_{key}' for key in BLOCKING_KEYS]
+        if not frames:
+            return pd.read_sql_query('SELECT * FROM main_rows LIMIT 0', staging_db).drop(columns=staged_columns)
+        candidates = pd.concat(frames, ignore_index=True).drop_duplicates('_pos').sort_values('_pos')
+        # SQLite hands back NULL as None; use NaN like read_csv does
+        candidates = candidates.drop(columns=staged_columns).reset_index(drop=True)
+        return candidates.where(candidates.notna(), np.nan)
+
+    def run_streaming_comparison(self, chunk_size: Optional[int] = None) -> Dict:
+        """Run the comparison without holding either CSV in memory.
+
+        The main file is staged into a temporary SQLite table indexed on Case ID
+        and Contact no. The missing file is then read chunk_size rows at a time;
+        each chunk is matched against the main rows it references, compared and
+        written to the database before the next chunk is read, so peak memory
+        depends on the chunk size rather than the file size. Each stored chunk
+        is checkpointed, so a restarted run resumes after the last one. Removed
+        Case IDs are not detected in this mode. Returns run totals.
+        """
+        chunk_size = chunk_size or env_int("COMPARISON_CHUNK_SIZE", DEFAULT_STREAM_CHUNK_SIZE)
+        max_patients = env_int("MAX_PATIENTS")
+        print(f"Starting streaming patient data comparison ({chunk_size} rows per chunk)...")
+        self._reset_progress()
+
+        total = sum(len(chunk) for chunk in pd.read_csv(self.missing_csv_path, usecols=[0], chunksize=chunk_size))
+        if max_patients is not None:
+            total = min(total, max_patients)
+        print(f"Missing file has {total} records to process")
+
+        run_key = self._checkpoint_key(max_patients)
+        resume_from = self._load_checkpoint(run_key)
+        if resume_from:
+            print(f"Resuming from checkpoint: {resume_from}/{total} rows already stored")
+
+        totals = {'total_patients': 0, 'total_questions': 0, 'total_missing_fields': 0}
+        run_stats = {}
+        position = 0
+        self._removed_case_ids = []
+        with tempfile.TemporaryDirectory() as staging_dir:
+            staging_db = sqlite3.connect(os.path.join(staging_dir, "staging.db"))
+            try:
+                self._stage_main_file(staging_db, chunk_size)
+
+                for chunk in pd.read_csv(self.missing_csv_path, chunksize=chunk_size):
+                    if position >= total:
+                        break
+                    chunk_start = position
+                    position += len(chunk)
+                    if position <= resume_from:
+                        continue
+                    skip = max(resume_from - chunk_start, 0)
+                    chunk = chunk.iloc[skip:total - chunk_start].reset_index(drop=True)
+                    processed = chunk_start + skip
+
+                    self.missing_df = chunk
+                    self.main_df = self._lookup_main_rows(staging_db, chunk)
+                    self._build_main_index()
+
+                    results = self._compare_rows(
+                        chunk, detect_removed=False, progress_offset=processed, progress_total=total
+                    )
+                    self.store_comparison_results(results, scoped=True, checkpoint=(run_key, processed + len(chunk)))
+
+                    totals['total_patients'] += len(results)
+                    totals['total_questions'] += sum(len(r['questions']) for r in results)
+                    totals['total_missing_fields'] += sum(len(r['missing_fields']) for r in results)
+                    self._add_run_stats(run_stats, self.last_run_stats)
+            finally:
+                staging_db.close()
+                self.main_df = None
+                self.missing_df = None
+
+        self._complete_checkpoint(run_key)
+        self.last_run_stats = run_stats
+        self._report_progress('done')
+        print(f"\nStreaming comparison complete! Found {totals['total_patients']} patients with missing data")
+        print(f"Total missing fields across all patients: {totals['total_missing_fields']}")
+        return totals
+
     def run_comparison(self):
-        """Run the complete comparison process"""
+        """Run the complete comparison process.
+
+        The missing file is compared and stored COMPARISON_BATCH_SIZE rows at a
+        time, and each stored batch is checkpointed. If the run dies, the next
+        run over the same files and settings resumes after the last stored batch;
+        question templates generated so far are already cached in pv.db.
+
+        With COMPARISON_WORKERS > 1, each batch is split into shards by Case ID
+        and matched/compared in that many worker processes sharing main_df and
+        its indexes; Azure calls and database writes stay in this process, so
+        there is still a single writer. Use a COMPARISON_BATCH_SIZE of several
+        thousand rows per worker for the processes to pay off.
+        """
         print("Starting patient data comparison...")
+        self._reset_progress()
         self.load_data()
-        
-        comparison_results = self.compare_data()
-        self.store_comparison_results(comparison_results)
+
+        max_patients = env_int("MAX_PATIENTS")
+        batch_size = max(env_int("COMPARISON_BATCH_SIZE", DEFAULT_BATCH_SIZE), 1)
+        self._build_main_index()
+        rows_df = self.missing_df if max_patients is None else self.missing_df.head(max_patients)
+        total = len(rows_df)
+
+        run_key = self._checkpoint_key(max_patients)
+        resume_from = self._load_checkpoint(run_key)
+        if resume_from:
+            print(f"Resuming from checkpoint: {resume_from}/{total} rows already stored")
+
+        self._removed_case_ids = []
+        if max_patients is None:
+            self._removed_case_ids = self._find_removed_case_ids(rows_df['Case ID'].tolist())
+        run_stats = {'removed': len(self._removed_case_ids)}
+
+        workers = env_int("COMPARISON_WORKERS", 1)
+        if workers > 1 and resume_from < total:
+            self._start_shard_pool(rows_df, workers)
+
+        comparison_results = []
+        try:
+            for start in range(resume_from, total, batch_size):
+                batch = rows_df.iloc[start:start + batch_size]
+                results = self._compare_rows(batch, detect_removed=False, progress_offset=start, progress_total=total)
+                self.store_comparison_results(results, scoped=True, checkpoint=(run_key, start + len(batch)))
+                comparison_results.extend(results)
+                self._add_run_stats(run_stats, self.last_run_stats)
+        finally:
+            self._stop_shard_pool()
+
+        self._complete_checkpoint(run_key)
+        self.last_run_stats = run_stats
+        self._report_progress('done')
         
         print(f"\nComparison complete! Found {len(comparison_results)} patients with missing data")
         
@@ -242,6 +1198,20 @@ class PatientDataComparator:
         
         return comparison_results
 
+    def run(self) -> Dict:
+        """Run in streaming mode when COMPARISON_CHUNK_SIZE is set, otherwise in memory; return totals"""
+        if env_int("COMPARISON_CHUNK_SIZE"):
+            totals = self.run_streaming_comparison()
+        else:
+            results = self.run_comparison()
+            totals = {
+                'total_patients': len(results),
+                'total_questions': sum(len(r['questions']) for r in results),
+                'total_missing_fields': sum(len(r['missing_fields']) for r in results),
+            }
+        totals['changes'] = self.last_run_stats
+        return totals
+
 if __name__ == "__main__":
     repo_root = Path(__file__).resolve().parent.parent
 
@@ -271,8 +1241,7 @@ if __name__ == "__main__":
     )
     
     # Run the comparison
-    results = comparator.run_comparison()
+    totals = comparator.run()
     
     # Display summary
-    total_questions = sum(len(r['questions']) for r in results)
-    print(f"\nGenerated {total_questions} questions for missing data")
+    print(f"\nGenerated {totals['total_questions']} questions for missing data")
@@ -0,0 +1,89 @@
+import hashlib
+import json
+import re
+from typing import Dict, Iterable, List, Tuple
+
+from database import SQL_IN_BATCH_SIZE, SessionLocal, engine
+from models.patient_comparison_model import QuestionTemplate
+
+# Placeholders sent to Azure instead of real patient details; cached questions
+# keep them and are filled in per patient.
+INITIALS_PLACEHOLDER = "{patient_initials}"
+CONTACT_PLACEHOLDER = "{contact_no}"
+
+FieldSet = Tuple[str, ...]
+
+PLACEHOLDER_RE = re.compile(r"\{[^{}]*\}")
+
+
+def normalize_field_set(fields: Iterable[str]) -> FieldSet:
+    """Order-independent, de-duplicated representation of a missing-field set"""
+    return tuple(sorted(set(fields)))
+
+
+def template_cache_key(field_set: FieldSet, language: str, prompt_version: str) -> str:
+    raw = json.dumps([prompt_version, language, list(field_set)], ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def is_valid_template(template: str) -> bool:
+    """Whether template has both placeholders and no other {...} token fill_template would leave in"""
+    if not isinstance(template, str):
+        return False
+    return set(PLACEHOLDER_RE.findall(template)) == {INITIALS_PLACEHOLDER, CONTACT_PLACEHOLDER}
+
+
+def fill_template(template: str, patient_initials, contact_no) -> str:
+    return (
+        template
+        .replace(INITIALS_PLACEHOLDER, str(patient_initials))
+        .replace(CONTACT_PLACEHOLDER, str(contact_no))
+    )
+
+
+class QuestionTemplateCache:
+    """Question templates in pv.db keyed by (missing-field set, language, prompt version)"""
+
+    def __init__(self, prompt_version: str):
+        self.prompt_version = prompt_version
+        QuestionTemplate.__table__.create(bind=engine, checkfirst=True)
+
+    def get_many(self, field_sets: List[FieldSet], language: str) -> Dict[FieldSet, Dict[str, str]]:
+        """Return cached templates for the given field sets, skipping misses"""
+        keys = {template_cache_key(fs, language, self.prompt_version): fs for fs in field_sets}
+        found: Dict[FieldSet, Dict[str, str]] = {}
+        db = SessionLocal()
+        try:
+            key_list = list(keys)
+            for start in range(0, len(key_list), SQL_IN_BATCH_SIZE):
+                rows = db.query(QuestionTemplate.cache_key, QuestionTemplate.templates).filter(
+                    QuestionTemplate.cache_key.in_(key_list[start:start + SQL_IN_BATCH_SIZE])
+                ).all()
+                for cache_key, templates in rows:
+                    found[keys[cache_key]] = json.loads(templates)
+        finally:
+            db.close()
+        return found
+
+    def put_many(self, entries: Dict[FieldSet, Dict[str, str]], language: str):
+        """Store templates for each field set, replacing any previous entry"""
+        if not entries:
+            return
+        db = SessionLocal()
+        try:
+            for field_set, templates in entries.items():
+                cache_key = template_cache_key(field_set, language, self.prompt_version)
+                db.query(QuestionTemplate).filter(QuestionTemplate.cache_key == cache_key).delete()
+                db.add(QuestionTemplate(
+                    cache_key=cache_key,
+                    field_set=json.dumps(list(field_set), ensure_ascii=False),
+                    language=language,
+                    prompt_version=self.prompt_version,
+                    templates=json.dumps(templates, ensure_ascii=False),
+                ))
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
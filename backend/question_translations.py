@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""Hindi translations of stored patient questions.
+
+Questions reach patients through /api/patient-interface/questions/{phn},
+which only reads question_hi from patient_comparisons.questions. Every
+question therefore gets its translation when it is stored: the comparator
+calls translate_questions() before writing results, and
+backfill_question_translations() fills in rows stored before that (or while
+the translator was unreachable).
+
+Usage:
+    python question_translations.py [--chunk-size N]
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+from typing import Dict, List
+
+from sqlalchemy import or_, update
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from database import SessionLocal
+from models.patient_comparison_model import PatientComparison
+from question_template_cache import CONTACT_PLACEHOLDER, INITIALS_PLACEHOLDER, fill_template
+from translation_cache import get_translation_cache
+
+# Comparisons read, translated and updated per transaction by the backfill
+BACKFILL_CHUNK_SIZE = 500
+
+# The comparator's fallback question; translated once per field, not per patient
+FALLBACK_QUESTION_RE = re.compile(r"^Please provide the (.+) for patient (.*) \(PHN: (.*)\)$", re.DOTALL)
+
+
+def _fallback_template(column: str) -> str:
+    return f"Please provide the {column} for patient {INITIALS_PLACEHOLDER} (PHN: {CONTACT_PLACEHOLDER})"
+
+
+def translate_questions(questions: List[Dict], target_lang: str = "hi") -> int:
+    """Fill in the empty question_hi of question dicts in place; returns how many were filled.
+
+    Fallback questions are translated as one placeholder template per field
+    and filled in per patient; a template whose translation loses a
+    placeholder, and every other question, is translated as is. All texts go
+    to the translation cache in one batched call per kind.
+    """
+    pending = [q for q in questions if isinstance(q, dict) and q.get('question') and not q.get('question_hi')]
+    if not pending:
+        return 0
+    cache = get_translation_cache()
+
+    templates: Dict[int, tuple] = {}
+    for k, q in enumerate(pending):
+        match = FALLBACK_QUESTION_RE.match(q['question'])
+        if match:
+            templates[k] = (_fallback_template(match.group(1)), match.group(2), match.group(3))
+    translated_templates = cache.translate_many([t[0] for t in templates.values()], "en", target_lang)
+
+    texts: Dict[int, str] = {}
+    for k, q in enumerate(pending):
+        if k in templates:
+            template, initials, contact_no = templates[k]
+            translated = translated_templates.get(template, "")
+            if INITIALS_PLACEHOLDER in translated and CONTACT_PLACEHOLDER in translated:
+                q['question_hi'] = fill_template(translated, initials, contact_no)
+                continue
+        texts[k] = q['question']
+    translated_texts = cache.translate_many(texts.values(), "en", target_lang)
+    for k, text in texts.items():
+        if translated_texts.get(text):
+            pending[k]['question_hi'] = translated_texts[text]
+
+    return sum(1 for q in pending if q.get('question_hi'))
+
+
+def _missing_hindi(questions: List) -> int:
+    return sum(1 for q in questions if isinstance(q, dict) and q.get('question') and not q.get('question_hi'))
+
+
+def backfill_question_translations(chunk_size: int = BACKFILL_CHUNK_SIZE) -> int:
+    """Translate every stored question still missing question_hi; returns how many were filled"""
+    filled = 0
+    last_id = 0
+    db = SessionLocal()
+    try:
+        while True:
+            rows = db.query(PatientComparison.id, PatientComparison.questions).filter(
+                PatientComparison.id > last_id,
+                # Rows with an empty question_hi, or from before questions had one
+                or_(
+                    PatientComparison.questions.like('%"question_hi": ""%'),
+                    PatientComparison.questions.notlike('%"question_hi"%'),
+                ),
+            ).order_by(PatientComparison.id).limit(chunk_size).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+
+            parsed = {}
+            for row in rows:
+                try:
+                    questions = json.loads(row.questions)
+                except (TypeError, ValueError):
+                    continue
+                if isinstance(questions, list) and _missing_hindi(questions):
+                    parsed[row.id] = (questions, _missing_hindi(questions))
+            translate_questions([q for questions, _ in parsed.values() for q in questions])
+
+            # translate_questions filled the dicts in place
+            updated = []
+            for comparison_id, (questions, missing) in parsed.items():
+                remaining = _missing_hindi(questions)
+                if remaining < missing:
+                    updated.append({'id': comparison_id, 'questions': json.dumps(questions)})
+                    filled += missing - remaining
+            if updated:
+                db.execute(update(PatientComparison), updated)
+                db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    return filled
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Translate stored patient questions that lack question_hi")
+    parser.add_argument("--chunk-size", type=int, default=BACKFILL_CHUNK_SIZE)
+    args = parser.parse_args()
+    print(f"Translated {backfill_question_translations(args.chunk_size)} questions")
@@ -0,0 +1,130 @@
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+# Trailing digits kept from a phone number, so "+91 98765 43210" and "9876543210" agree
+PHONE_SUFFIX_DIGITS = 10
+# Blocks holding more main rows than this are too unspecific to be worth scoring
+MAX_BLOCK_SIZE = 50
+# Points per agreeing field; a disagreeing field present on both sides costs the same
+FIELD_WEIGHTS = {
+    'phone_key': 4.0,
+    'case_key': 3.0,
+    'dob_key': 2.0,
+    'initials_key': 1.0,
+    'sex_key': 0.5,
+}
+# Minimum score for a link: e.g. the phone number alone, or case-id digits plus initials
+LINK_THRESHOLD = 4.0
+BLOCKING_KEYS = ('phone_key', 'case_key', 'person_key')
+
+
+def _text(series: pd.Series) -> pd.Series:
+    """Values as strings, with whole-number floats (CSV ints next to blanks) printed without ".0" """
+    if pd.api.types.is_float_dtype(series):
+        whole = series.notna() & (series == series.round())
+        text = series.astype('string')
+        text[whole] = series[whole].astype('int64').astype('string')
+        return text
+    return series.astype('string')
+
+
+def _blank_to_na(series: pd.Series) -> pd.Series:
+    return series.mask(series.eq(''))
+
+
+def linkage_keys(df: pd.DataFrame) -> pd.DataFrame:
+    """Normalized identifiers and blocking keys for each row of a SYOMS frame.
+
+    phone_key    last PHONE_SUFFIX_DIGITS digits of Contact no
+    case_key     digit groups of Case ID without leading zeros ("CASE-2026-0001" -> "2026-1")
+    initials_key upper-case letters of Patient Initials
+    dob_key      Date of Birth as YYYY-MM-DD (day-first input)
+    person_key   initials_key + dob_key
+    Missing or unusable values are <NA>.
+    """
+    keys = pd.DataFrame(index=df.index)
+
+    phone = _text(df['Contact no']).str.replace(r'\D', '', regex=True)
+    phone = phone.where(phone.str.len() >= PHONE_SUFFIX_DIGITS)
+    keys['phone_key'] = phone.str[-PHONE_SUFFIX_DIGITS:]
+
+    case_digits = _text(df['Case ID']).str.findall(r'\d+')
+    keys['case_key'] = _blank_to_na(
+        case_digits.map(lambda groups: '-'.join(g.lstrip('0') or '0' for g in groups), na_action='ignore')
+        .astype('string')
+    )
+
+    keys['initials_key'] = _blank_to_na(_text(df['Patient Initials']).str.upper().str.replace(r'[^A-Z]', '', regex=True))
+    dob_text = _text(df['Date of Birth']).str.strip()
+    dob = pd.to_datetime(dob_text, format='%d/%m/%Y', errors='coerce')
+    other_formats = dob.isna() & dob_text.notna()
+    if other_formats.any():
+        # Parsing element by element is slow, so only for values not in the SYOMS format
+        dob[other_formats] = pd.to_datetime(dob_text[other_formats], dayfirst=True, format='mixed', errors='coerce')
+    keys['dob_key'] = dob.dt.strftime('%Y-%m-%d').astype('string')
+    keys['person_key'] = keys['initials_key'] + '|' + keys['dob_key']
+
+    keys['sex_key'] = _blank_to_na(_text(df['Sex']).str.strip().str.upper().str[:1]) if 'Sex' in df else pd.NA
+    return keys
+
+
+class RecordLinker:
+    """Fuzzy fallback for patients whose Case ID and Contact no match no main row exactly.
+
+    Main rows are grouped into blocks by each blocking key (phone suffix,
+    case-id digits, initials + date of birth); an unmatched row is scored only
+    against the main rows sharing one of its blocks, so linking stays close to
+    linear in the number of rows instead of comparing every pair. A row links
+    to its best-scoring candidate when the score reaches LINK_THRESHOLD and no
+    other candidate ties it.
+    """
+
+    def __init__(self, main_df: pd.DataFrame):
+        self.main_keys = linkage_keys(main_df)
+        self._main_values = {
+            field: self.main_keys[field].to_numpy(dtype=object, na_value=None) for field in FIELD_WEIGHTS
+        }
+        self.blocks: Dict[str, Dict[str, List[int]]] = {}
+        for key in BLOCKING_KEYS:
+            block = defaultdict(list)
+            for pos, value in enumerate(self.main_keys[key].to_numpy(dtype=object, na_value=None)):
+                if value is not None:
+                    block[value].append(pos)
+            self.blocks[key] = {value: positions for value, positions in block.items() if len(positions) <= MAX_BLOCK_SIZE}
+
+    def _score(self, row_values: Dict, main_pos: int) -> float:
+        score = 0.0
+        for field, weight in FIELD_WEIGHTS.items():
+            value = row_values[field]
+            main_value = self._main_values[field][main_pos]
+            if value is None or main_value is None:
+                continue
+            score += weight if value == main_value else -weight
+        return score
+
+    def link(self, rows_df: pd.DataFrame) -> List[Optional[int]]:
+        """main_df position linked to each row of rows_df, or None"""
+        row_keys = linkage_keys(rows_df)
+        columns = {
+            field: row_keys[field].to_numpy(dtype=object, na_value=None)
+            for field in set(FIELD_WEIGHTS) | set(BLOCKING_KEYS)
+        }
+        links = []
+        for k in range(len(rows_df)):
+            row_values = {field: values[k] for field, values in columns.items()}
+            candidates = set()
+            for key in BLOCKING_KEYS:
+                if row_values[key] is not None:
+                    candidates.update(self.blocks[key].get(row_values[key], ()))
+
+            best_pos, best_score, tied = None, LINK_THRESHOLD, False
+            for pos in sorted(candidates):
+                score = self._score(row_values, pos)
+                if score > best_score or (best_pos is None and score == best_score):
+                    best_pos, best_score, tied = pos, score, False
+                elif score == best_score:
+                    tied = True
+            links.append(None if tied else best_pos)
+        return links
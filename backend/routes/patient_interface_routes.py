@@ -4,7 +4,6 @@ from typing import List, Dict, Optional
 import sqlite3
 import json
 from datetime import datetime
-from deep_translator import GoogleTranslator
 
 router = APIRouter(prefix="/api/patient-interface", tags=["patient-interface"])
 
@@ -55,26 +54,28 @@ class PatientInterface:
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
 
+        # question_hi is stored with each question when it is ingested
+        # (question_translations.py); nothing is translated per request
         cursor.execute('''
-            SELECT questions
+            SELECT case_id, questions
             FROM patient_comparisons
             WHERE contact_no = ?
-            LIMIT 1
         ''', (phn,))
-        comparison_row = cursor.fetchone()
-        question_hi_by_field: Dict[str, str] = {}
-        if comparison_row and comparison_row[0]:
+        question_hi_by_case_field: Dict[tuple, str] = {}
+        for case_id, questions_json in cursor.fetchall():
+            if not questions_json:
+                continue
             try:
-                all_q = json.loads(comparison_row[0])
-                if isinstance(all_q, list):
-                    for q in all_q:
-                        if isinstance(q, dict):
-                            field = q.get('field')
-                            q_hi = q.get('question_hi')
-                            if isinstance(field, str) and isinstance(q_hi, str) and q_hi.strip():
-                                question_hi_by_field[field] = q_hi.strip()
+                all_q = json.loads(questions_json)
             except Exception:
-                question_hi_by_field = {}
+                continue
+            if isinstance(all_q, list):
+                for q in all_q:
+                    if isinstance(q, dict):
+                        field = q.get('field')
+                        q_hi = q.get('question_hi')
+                        if isinstance(field, str) and isinstance(q_hi, str) and q_hi.strip():
+                            question_hi_by_case_field[(case_id, field)] = q_hi.strip()
         
         cursor.execute('''
             SELECT pr.id, pr.case_id, pr.field_name, pr.question, 
@@ -86,23 +87,13 @@ class PatientInterface:
         ''', (phn,))
         
         questions = []
-        translator = None
         for row in cursor.fetchall():
-            q_hi = question_hi_by_field.get(row[2], "")
-            if not q_hi:
-                try:
-                    if translator is None:
-                        translator = GoogleTranslator(source="en", target="hi")
-                    q_hi = translator.translate(row[3])
-                except Exception:
-                    q_hi = ""
-
             questions.append({
                 'response_id': row[0],
                 'case_id': row[1],
                 'field_name': row[2],
                 'question': row[3],
-                'question_hi': q_hi,
+                'question_hi': question_hi_by_case_field.get((row[1], row[2]), ""),
                 'expected_answer': row[4],
                 'patient_initials': row[5]
             })
@@ -40,11 +40,12 @@ class PatientQuestion(BaseModel):
     question: str
     expected_answer: str
 
-@router.post("/run-comparison")
+@router.post("/run-comparison", status_code=202)
 async def run_comparison():
-    """Run the CSV comparison and populate database"""
+    """Queue a CSV comparison as a background job and return its job id"""
     try:
         from patient_data_comparator import PatientDataComparator
+        from comparison_jobs import comparison_jobs
         
         comparator = PatientDataComparator(
             main_csv_path="/home/shaluchan/ai-docker/pharma-covigilance/syoms1.csv",
@@ -52,17 +53,72 @@ async def run_comparison():
             db_path="/home/shaluchan/ai-docker/pharma-covigilance/AI-Pharmacovigilance-System/pv.db"
         )
         
-        results = comparator.run_comparison()
+        job = comparison_jobs.submit(comparator)
         
         return {
-            "status": "success",
-            "message": f"Comparison completed for {len(results)} patients",
-            "total_patients": len(results),
-            "total_questions": sum(len(r['questions']) for r in results)
+            "status": job.status,
+            "message": "Comparison job submitted",
+            "job_id": job.job_id
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/comparison-jobs/{job_id}")
+async def get_comparison_job(job_id: str):
+    """Get progress of a comparison job: patients processed, questions generated and ETA"""
+    from comparison_jobs import comparison_jobs
+
+    job = comparison_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Comparison job not found")
+    return job.to_dict()
+
+@router.post("/comparison-jobs/{job_id}/cancel")
+async def cancel_comparison_job(job_id: str):
+    """Cancel a queued job, or stop a running one at its next progress point"""
+    from comparison_jobs import comparison_jobs
+
+    job = comparison_jobs.cancel(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Comparison job not found")
+    return job.to_dict()
+
+@router.get("/comparison-jobs/{job_id}/result")
+async def get_comparison_job_result(job_id: str):
+    """Get the final result of a finished comparison job"""
+    from comparison_jobs import comparison_jobs
+
+    job = comparison_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Comparison job not found")
+    if job.status in ("queued", "running"):
+        raise HTTPException(status_code=409, detail=f"Comparison job is still {job.status}")
+    if job.status == "failed":
+        raise HTTPException(status_code=500, detail=job.error)
+    if job.status == "cancelled":
+        return {"status": "cancelled", "job_id": job.job_id}
+    
+    return {
+        "status": "success",
+        "job_id": job.job_id,
+        "message": f"Comparison completed for {job.result['total_patients']} patients",
+        "total_patients": job.result['total_patients'],
+        "total_questions": job.result['total_questions'],
+        "changes": job.result['changes']
+    }
+
+@router.get("/missing-fields/{field_name}")
+async def get_patients_missing_field(field_name: str, db: Session = Depends(get_db)):
+    """List all patients missing a field (e.g. Daily Dose)"""
+    from missing_field_mask import patients_missing_field
+
+    patients = patients_missing_field(db, field_name)
+    return {
+        "field_name": field_name,
+        "patients": patients,
+        "total": len(patients)
+    }
+
 @router.post("/lookup-phn")
 async def lookup_phn(phn_data: PHNLookupInput, db: Session = Depends(get_db)):
     """Lookup patient by PHN number and return their questions"""
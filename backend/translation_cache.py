@@ -0,0 +1,224 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import insert
+
+from config import env_int
+from database import SQL_IN_BATCH_SIZE, SessionLocal, engine
+from models.patient_comparison_model import Translation
+
+ENGINE_GOOGLE = "google"
+DEFAULT_LRU_ENTRIES = 4096
+# Google Translate takes up to 5000 characters per request
+GOOGLE_BATCH_CHARS = 4500
+
+# (texts, source_lang, target_lang) -> translations in the same order, None where one failed
+Translate = Callable[[List[str], str, str], List[Optional[str]]]
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _text_batches(texts: List[str], max_chars: int) -> List[List[str]]:
+    """Consecutive groups of single-line texts whose newline-joined length fits max_chars"""
+    batches: List[List[str]] = []
+    current: List[str] = []
+    length = 0
+    for text in texts:
+        if current and ("\n" in text or length + 1 + len(text) > max_chars):
+            batches.append(current)
+            current, length = [], 0
+        current.append(text)
+        length += len(text) + (1 if length else 0)
+        if "\n" in text:
+            batches.append(current)
+            current, length = [], 0
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _google_translate(texts: List[str], source_lang: str, target_lang: str) -> List[Optional[str]]:
+    """One request per GOOGLE_BATCH_CHARS of newline-joined texts.
+
+    A batch whose reply has a different number of lines is translated text
+    by text instead. After a failed request the rest are left untranslated
+    (None): the service is unreachable, and retrying every text would only
+    multiply the timeouts.
+    """
+    from deep_translator import GoogleTranslator
+
+    translator = GoogleTranslator(source=source_lang, target=target_lang)
+    results: List[Optional[str]] = []
+    try:
+        for batch in _text_batches(texts, GOOGLE_BATCH_CHARS):
+            if len(batch) == 1:
+                results.append(translator.translate(batch[0]))
+                continue
+            lines = (translator.translate("\n".join(batch)) or "").split("\n")
+            if len(lines) == len(batch):
+                results.extend(lines)
+            else:
+                results.extend(translator.translate(text) for text in batch)
+    except Exception as e:
+        # The message carries the whole request URL; the start says enough
+        print(f"Translation error, {len(texts) - len(results)} texts left untranslated:", str(e)[:200])
+    return results + [None] * (len(texts) - len(results))
+
+
+ENGINES: Dict[str, Translate] = {ENGINE_GOOGLE: _google_translate}
+
+CacheKey = Tuple[str, str, str, str]
+
+
+class TranslationCache:
+    """Translations in pv.db keyed by (source text hash, source lang, target lang, engine),
+    with an in-process LRU of max_entries in front.
+
+    translate_many() looks texts up in the LRU, then the table, and sends
+    only the remaining distinct texts to the engine; new translations are
+    stored in both. Failed or empty translations are not cached, so they
+    are retried on the next call.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_LRU_ENTRIES, engines: Dict[str, Translate] | None = None):
+        self.max_entries = max(max_entries, 1)
+        self.engines = dict(engines if engines is not None else ENGINES)
+        self._lock = threading.Lock()
+        self._lru: "OrderedDict[CacheKey, str]" = OrderedDict()
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.translated = 0
+        self.failed = 0
+        Translation.__table__.create(bind=engine, checkfirst=True)
+
+    def _remember(self, key: CacheKey, translated: str):
+        with self._lock:
+            self._lru[key] = translated
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.max_entries:
+                self._lru.popitem(last=False)
+
+    def get_many(self, texts: Iterable[str], source_lang: str, target_lang: str, engine_name: str = ENGINE_GOOGLE) -> Dict[str, str]:
+        """Cached translations of the given texts, skipping misses"""
+        found: Dict[str, str] = {}
+        missing: Dict[str, str] = {}  # hash -> text
+        with self._lock:
+            for text in dict.fromkeys(texts):
+                key = (text_hash(text), source_lang, target_lang, engine_name)
+                translated = self._lru.get(key)
+                if translated is None:
+                    missing[key[0]] = text
+                    continue
+                self._lru.move_to_end(key)
+                self.memory_hits += 1
+                found[text] = translated
+        if not missing:
+            return found
+
+        db = SessionLocal()
+        try:
+            hashes = list(missing)
+            for start in range(0, len(hashes), SQL_IN_BATCH_SIZE):
+                rows = db.query(Translation.source_hash, Translation.translated_text).filter(
+                    Translation.source_hash.in_(hashes[start:start + SQL_IN_BATCH_SIZE]),
+                    Translation.source_lang == source_lang,
+                    Translation.target_lang == target_lang,
+                    Translation.engine == engine_name,
+                ).all()
+                for source_hash, translated in rows:
+                    found[missing[source_hash]] = translated
+                    self._remember((source_hash, source_lang, target_lang, engine_name), translated)
+                    with self._lock:
+                        self.db_hits += 1
+        finally:
+            db.close()
+        return found
+
+    def put_many(self, translations: Dict[str, str], source_lang: str, target_lang: str, engine_name: str = ENGINE_GOOGLE):
+        """Store translations, replacing any previous entry for the same key"""
+        if not translations:
+            return
+        rows = [
+            {
+                "source_hash": text_hash(text),
+                "source_lang": source_lang,
+                "target_lang": target_lang,
+                "engine": engine_name,
+                "source_text": text,
+                "translated_text": translated,
+            }
+            for text, translated in translations.items()
+        ]
+        db = SessionLocal()
+        try:
+            db.execute(insert(Translation).prefix_with("OR REPLACE"), rows)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        for row in rows:
+            self._remember((row["source_hash"], source_lang, target_lang, engine_name), row["translated_text"])
+
+    def translate_many(
+        self,
+        texts: Iterable[str],
+        source_lang: str = "en",
+        target_lang: str = "hi",
+        engine_name: str = ENGINE_GOOGLE,
+    ) -> Dict[str, str]:
+        """Translation of each text, from the cache or the engine; texts the engine failed on are left out"""
+        texts = [text for text in dict.fromkeys(texts) if isinstance(text, str) and text.strip()]
+        found = self.get_many(texts, source_lang, target_lang, engine_name)
+        misses = [text for text in texts if text not in found]
+        if not misses:
+            return found
+
+        new: Dict[str, str] = {}
+        try:
+            results = self.engines[engine_name](misses, source_lang, target_lang)
+        except Exception as e:
+            print("Translation error:", e)
+            results = []
+        for text, translated in zip(misses, results):
+            if isinstance(translated, str) and translated.strip():
+                new[text] = translated.strip()
+        with self._lock:
+            self.translated += len(new)
+            self.failed += len(misses) - len(new)
+        self.put_many(new, source_lang, target_lang, engine_name)
+        found.update(new)
+        return found
+
+    def translate(self, text: str, source_lang: str = "en", target_lang: str = "hi", engine_name: str = ENGINE_GOOGLE) -> str:
+        """Translation of text, or "" if the engine failed"""
+        return self.translate_many([text], source_lang, target_lang, engine_name).get(text, "")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "memory_entries": len(self._lru),
+                "max_entries": self.max_entries,
+                "memory_hits": self.memory_hits,
+                "db_hits": self.db_hits,
+                "translated": self.translated,
+                "failed": self.failed,
+            }
+
+
+_cache: TranslationCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_translation_cache() -> TranslationCache:
+    """The process-wide cache, its LRU sized on first use by TRANSLATION_CACHE_MAX_ENTRIES"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = TranslationCache(env_int("TRANSLATION_CACHE_MAX_ENTRIES", DEFAULT_LRU_ENTRIES))
+        return _cache